@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from data_cleaner.data_cleaner import DataCleaner
+
+
+def make_policies(rows, seed=42):
+    """Generate a DataFrame with Title/Gender values distributed like the MachineLearningRating data."""
+    rng = np.random.default_rng(seed)
+    titles = rng.choice(['Mr', 'Mrs', 'Ms', 'Miss', 'Dr', np.nan], size=rows,
+                        p=[0.90, 0.05, 0.02, 0.01, 0.01, 0.01])
+    genders = rng.choice(['Male', 'Female', 'Not specified', np.nan], size=rows,
+                         p=[0.04, 0.01, 0.94, 0.01])
+    return pd.DataFrame({'Title': titles, 'Gender': genders})
+
+
+def time_method(df, method, repeat):
+    """Return the best wall time of `repeat` runs of a DataCleaner method and its result."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        cleaner = DataCleaner(df.copy())
+        start = time.perf_counter()
+        getattr(cleaner, method)()
+        best = min(best, time.perf_counter() - start)
+        result = cleaner.get_cleaned_data()['Gender']
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DataCleaner.clean_gender against the row-wise apply.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Number of synthetic policy rows.")
+    parser.add_argument('--repeat', type=int, default=3, help="Number of runs per implementation.")
+    parser.add_argument('--csv', help="Optional CSV file with 'Title' and 'Gender' columns to use instead.")
+    args = parser.parse_args()
+
+    if args.csv:
+        df = pd.read_csv(args.csv, usecols=['Title', 'Gender'])
+    else:
+        df = make_policies(args.rows)
+
+    rowwise_time, rowwise = time_method(df, 'clean_gender_rowwise', args.repeat)
+    vectorized_time, vectorized = time_method(df, 'clean_gender', args.repeat)
+
+    pd.testing.assert_series_equal(vectorized, rowwise)
+
+    print(f"Rows:        {len(df):,}")
+    print(f"Row-wise:    {rowwise_time:.3f}s")
+    print(f"Vectorized:  {vectorized_time:.3f}s")
+    print(f"Speed-up:    {rowwise_time / vectorized_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,115 @@
 import csv
+import hashlib
+import io
+import json
+import locale
 import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from data_loader.data_loader import MLR_SCHEMA
+from utils.instrumentation import instrumented, stage
+
+# Buffer size used for the large sequential reads and writes of the streaming mode.
+IO_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+def _arrow_column_types(column_names):
+    """Map every column of the input to its Arrow type according to MLR_SCHEMA."""
+    import pyarrow as pa
+
+    arrow_types = {
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'timestamp': pa.timestamp('ns'),
+        'bool': pa.bool_(),
+        'int16': pa.int16(),
+        'int32': pa.int32(),
+        'int64': pa.int64(),
+        'float32': pa.float32(),
+        'float64': pa.float64(),
+        'string': pa.string(),
+    }
+    return {name: arrow_types[MLR_SCHEMA.get(name, 'string')] for name in column_names}
+
+
+def find_line_boundaries(path: str, chunk_size: int):
+    """
+    Split a file into byte ranges of roughly `chunk_size` bytes, aligned to line endings.
+
+    :param path: Path to the file to split.
+    :param chunk_size: Target size of each byte range in bytes.
+    :return: List of (start, end) byte offsets covering the whole file.
+    """
+    file_size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, 'rb') as f:
+        position = chunk_size
+        while position < file_size:
+            f.seek(position)
+            f.readline()  # Move forward to the start of the next line
+            boundary = f.tell()
+            if boundary >= file_size:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+            position = boundary + chunk_size
+    boundaries.append(file_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _convert_byte_range(task):
+    """
+    Convert one line-aligned byte range of the pipe-separated file into a CSV part file.
+
+    Runs inside a worker process. Returns the number of rows written.
+    """
+    input_file, part_file, start, end, encoding = task
+    with open(input_file, 'rb') as infile:
+        infile.seek(start)
+        raw = infile.read(end - start)
+
+    reader = csv.reader(io.StringIO(raw.decode(encoding), newline=''), delimiter='|')
+    rows = 0
+    with open(part_file, 'w', newline='', encoding=encoding, buffering=IO_BUFFER_SIZE) as outfile:
+        writer = csv.writer(outfile)
+        for row in reader:
+            writer.writerow(row)
+            rows += 1
+    return rows
+
+
+def _hash_byte_range(task):
+    """Return the MD5 hex digest of one byte range of a file. Runs inside a worker process."""
+    path, start, end = task
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(IO_BUFFER_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def _append_parts(part_files, outfile):
+    """Append the part files, in order, to an open binary file. Returns the size of each part."""
+    sizes = []
+    for part_file in part_files:
+        with open(part_file, 'rb') as part:
+            shutil.copyfileobj(part, outfile, IO_BUFFER_SIZE)
+        sizes.append(os.path.getsize(part_file))
+        os.remove(part_file)
+    return sizes
+
+
+def _result_rows(result):
+    """Rows converted, from the result dictionary of a conversion (None if it was skipped or failed)."""
+    return result['rows'] if result else None
+
 
 class TxtToCSVConverter:
     def __init__(self, input_file: str, output_file: str):
@@ -21,13 +131,226 @@ class TxtToCSVConverter:
             return
 
         try:
-            with open(self.input_file, 'r') as infile, open(self.output_file, 'w', newline='') as outfile:
+            with stage('TxtToCSVConverter.convert') as record, open(self.input_file, 'r') as infile, \
+                    open(self.output_file, 'w', newline='') as outfile:
                 reader = csv.reader(infile, delimiter='|')
                 writer = csv.writer(outfile)
-                
+
                 # Write the content to the CSV file
+                record['rows'] = 0
                 for row in reader:
                     writer.writerow(row)
+                    record['rows'] += 1
             print(f"Conversion successful: {self.output_file}")
         except Exception as e:
             print(f"An error occurred during conversion: {e}")
+
+    @instrumented(rows=_result_rows)
+    def convert_parallel(self, workers=None, chunk_size=64 * 1024 * 1024, encoding=None):
+        """
+        Convert the pipe-separated file to CSV using a pool of worker processes.
+
+        The input is split into line-aligned byte ranges which are converted independently
+        into part files and then joined, in their original order, into the output file.
+        Fields are assumed not to contain embedded line breaks.
+
+        :param workers: Number of worker processes (defaults to the number of CPUs).
+        :param chunk_size: Target size in bytes of each byte range handed to a worker.
+        :param encoding: Text encoding of the input and output (defaults to the locale encoding).
+        :return: Dictionary with the number of rows, chunks, elapsed seconds and rows per second,
+                 or None if the conversion was skipped or failed.
+        """
+        if os.path.exists(self.output_file):
+            print(f"Output file already exists: {self.output_file}. Conversion skipped.")
+            return None
+
+        encoding = encoding or locale.getpreferredencoding(False)
+        workers = workers or os.cpu_count() or 1
+        output_dir = os.path.dirname(os.path.abspath(self.output_file))
+
+        start_time = time.perf_counter()
+        try:
+            ranges = find_line_boundaries(self.input_file, chunk_size)
+            with tempfile.TemporaryDirectory(dir=output_dir) as tmp_dir:
+                part_files, part_rows = self._convert_ranges(ranges, tmp_dir, workers, encoding)
+                rows = sum(part_rows)
+
+                # Join the parts in order, then move the result into place in one step
+                joined_file = os.path.join(tmp_dir, 'joined.csv')
+                with open(joined_file, 'wb') as outfile:
+                    _append_parts(part_files, outfile)
+                os.replace(joined_file, self.output_file)
+        except Exception as e:
+            print(f"An error occurred during conversion: {e}")
+            return None
+
+        elapsed = time.perf_counter() - start_time
+        rows_per_second = rows / elapsed if elapsed > 0 else float('inf')
+        print(f"Conversion successful: {self.output_file} "
+              f"({rows:,} rows in {elapsed:.2f}s, {rows_per_second:,.0f} rows/s, "
+              f"{len(ranges)} chunks on {workers} workers)")
+        return {
+            'rows': rows,
+            'chunks': len(ranges),
+            'seconds': elapsed,
+            'rows_per_second': rows_per_second,
+        }
+
+    @instrumented(rows=_result_rows)
+    def convert_incremental(self, workers=None, chunk_size=64 * 1024 * 1024, encoding=None,
+                            manifest_file=None):
+        """
+        Bring the CSV output up to date with the pipe-separated file, reconverting only what changed.
+
+        A manifest next to the output records the size and modification time of the input and
+        an MD5 hash per line-aligned chunk, together with the size of the CSV produced for it.
+        If the input's size and mtime are unchanged nothing is done. Otherwise the chunks are
+        rehashed, the output is truncated after the last unchanged leading chunk and only the
+        remaining (changed or appended) chunks are converted and appended. If the output or the
+        manifest does not match, the whole file is converted.
+
+        :param workers: Number of worker processes (defaults to the number of CPUs).
+        :param chunk_size: Target size in bytes of each chunk.
+        :param encoding: Text encoding of the input and output (defaults to the locale encoding).
+        :param manifest_file: Path of the manifest (defaults to the output file + '.manifest.json').
+        :return: Dictionary with the number of reused and converted chunks, the rows converted
+                 and the elapsed seconds, or None if the conversion failed.
+        """
+        encoding = encoding or locale.getpreferredencoding(False)
+        workers = workers or os.cpu_count() or 1
+        manifest_file = manifest_file or self.output_file + '.manifest.json'
+        output_dir = os.path.dirname(os.path.abspath(self.output_file))
+
+        start_time = time.perf_counter()
+        try:
+            stat = os.stat(self.input_file)
+            manifest = self._load_manifest(manifest_file, chunk_size, encoding)
+
+            if (manifest is not None and manifest['size'] == stat.st_size
+                    and manifest['mtime'] == stat.st_mtime):
+                print(f"Output file is up to date: {self.output_file}. Conversion skipped.")
+                return {'reused_chunks': len(manifest['chunks']), 'converted_chunks': 0,
+                        'rows': 0, 'seconds': time.perf_counter() - start_time}
+
+            ranges = find_line_boundaries(self.input_file, chunk_size)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                hashes = list(executor.map(_hash_byte_range,
+                                           [(self.input_file, start, end) for start, end in ranges]))
+
+            # Keep the leading chunks whose byte range and content are unchanged
+            old_chunks = manifest['chunks'] if manifest is not None else []
+            reused = 0
+            for old, (start, end), md5 in zip(old_chunks, ranges, hashes):
+                if (old['start'], old['end'], old['md5']) != (start, end, md5):
+                    break
+                reused += 1
+            chunks = old_chunks[:reused]
+            keep_bytes = sum(chunk['output_size'] for chunk in chunks)
+
+            with tempfile.TemporaryDirectory(dir=output_dir) as tmp_dir:
+                part_files, part_rows = self._convert_ranges(ranges[reused:], tmp_dir, workers, encoding)
+                mode = 'r+b' if os.path.exists(self.output_file) else 'wb'
+                with open(self.output_file, mode) as outfile:
+                    outfile.truncate(keep_bytes)
+                    outfile.seek(keep_bytes)
+                    part_sizes = _append_parts(part_files, outfile)
+
+            for (start, end), md5, rows, size in zip(ranges[reused:], hashes[reused:], part_rows, part_sizes):
+                chunks.append({'start': start, 'end': end, 'md5': md5, 'rows': rows, 'output_size': size})
+
+            with open(manifest_file, 'w') as f:
+                json.dump({
+                    'input_file': os.path.abspath(self.input_file),
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                    'chunk_size': chunk_size,
+                    'encoding': encoding,
+                    'output_size': keep_bytes + sum(part_sizes),
+                    'chunks': chunks,
+                }, f, indent=2)
+        except Exception as e:
+            print(f"An error occurred during conversion: {e}")
+            return None
+
+        elapsed = time.perf_counter() - start_time
+        rows = sum(part_rows)
+        print(f"Conversion successful: {self.output_file} "
+              f"({reused} chunks reused, {len(part_files)} chunks converted, {rows:,} rows in {elapsed:.2f}s)")
+        return {'reused_chunks': reused, 'converted_chunks': len(part_files), 'rows': rows, 'seconds': elapsed}
+
+    def _load_manifest(self, manifest_file, chunk_size, encoding):
+        """Load the manifest if it is usable for the current output, otherwise return None."""
+        if not os.path.exists(manifest_file) or not os.path.exists(self.output_file):
+            return None
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+        if (manifest.get('chunk_size') != chunk_size or manifest.get('encoding') != encoding
+                or manifest.get('output_size') != os.path.getsize(self.output_file)):
+            return None
+        return manifest
+
+    def _convert_ranges(self, ranges, tmp_dir, workers, encoding):
+        """Convert byte ranges of the input into part files in `tmp_dir` using a process pool."""
+        part_files = [os.path.join(tmp_dir, f"part-{i:05d}.csv") for i in range(len(ranges))]
+        tasks = [(self.input_file, part_file, start, end, encoding)
+                 for part_file, (start, end) in zip(part_files, ranges)]
+        if not tasks:
+            return [], []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            part_rows = list(executor.map(_convert_byte_range, tasks))
+        return part_files, part_rows
+
+    def convert_to_parquet(self, parquet_file=None, row_group_size=128 * 1024, compression='snappy'):
+        """
+        Convert the pipe-separated file to a typed, columnar Parquet file.
+
+        Columns are typed according to MLR_SCHEMA (categoricals, timestamps, float32 money
+        columns) and every row group carries min/max/null-count statistics, so readers can
+        load only the columns and row groups they need. Requires pyarrow.
+
+        :param parquet_file: Path to the output Parquet file (defaults to the output file
+                             with a .parquet extension).
+        :param row_group_size: Maximum number of rows per row group.
+        :param compression: Parquet compression codec.
+        :return: Path of the Parquet file, or None if the conversion failed.
+        """
+        parquet_file = parquet_file or os.path.splitext(self.output_file)[0] + '.parquet'
+        if os.path.exists(parquet_file):
+            print(f"Output file already exists: {parquet_file}. Conversion skipped.")
+            return parquet_file
+
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow") from e
+
+        try:
+            with open(self.input_file, 'r', newline='') as infile:
+                column_names = next(csv.reader(infile, delimiter='|'))
+
+            reader = pa_csv.open_csv(
+                self.input_file,
+                read_options=pa_csv.ReadOptions(block_size=IO_BUFFER_SIZE),
+                parse_options=pa_csv.ParseOptions(delimiter='|'),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types=_arrow_column_types(column_names),
+                    strings_can_be_null=True,  # Empty fields become missing values, as with pd.read_csv
+                ),
+            )
+            tmp_file = parquet_file + '.tmp'
+            rows = 0
+            with stage('TxtToCSVConverter.convert_to_parquet') as record, \
+                    pq.ParquetWriter(tmp_file, reader.schema, compression=compression, write_statistics=True) as writer:
+                for batch in reader:
+                    writer.write_table(pa.Table.from_batches([batch]), row_group_size=row_group_size)
+                    rows += batch.num_rows
+                record['rows'] = rows
+            os.replace(tmp_file, parquet_file)
+        except Exception as e:
+            print(f"An error occurred during conversion: {e}")
+            return None
+
+        print(f"Conversion successful: {parquet_file} ({rows:,} rows)")
+        return parquet_file
@@ -0,0 +1,35 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from data_loader.data_loader import DataLoader
+from eda.eda import EDA
+from utils.instrumentation import instrumentation
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the EDA charts of a CSV or Parquet file to image files.")
+    parser.add_argument('path', help="CSV or Parquet file with the policy data.")
+    parser.add_argument('--output-dir', default='reports/eda', help="Directory the charts are written to.")
+    parser.add_argument('--columns', nargs='+', help="Columns to chart (all columns by default).")
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count() or 1, help="Number of rendering processes.")
+    parser.add_argument('--bins', type=int, default=50, help="Number of histogram bins.")
+    parser.add_argument('--metrics-file', help="Append the time and memory of every stage to this JSON lines file.")
+    parser.add_argument('--profile-dir', help="Write a cProfile dump of every outermost stage to this directory.")
+    args = parser.parse_args()
+    instrumentation.configure(metrics_file=args.metrics_file, profile_dir=args.profile_dir)
+
+    start = time.perf_counter()
+    data = DataLoader(args.path, columns=args.columns).load()
+    charts = EDA(data).render_report(args.output_dir, n_jobs=args.n_jobs, bins=args.bins)
+
+    print(f"Charts:   {len(charts)} ({charts['cached'].sum()} cached)")
+    print(f"Output:   {os.path.abspath(args.output_dir)}")
+    print(f"Time:     {time.perf_counter() - start:.1f}s")
+    print(instrumentation.summary()[['calls', 'total_wall_time_s', 'peak_rss_mb', 'rows']].to_string())
+
+
+if __name__ == '__main__':
+    main()
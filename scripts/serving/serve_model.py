@@ -0,0 +1,35 @@
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from statical_modeling.serving.scoring_service import ScoringService, make_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve premium/claim predictions of a trained model over HTTP.")
+    parser.add_argument('--preprocessor', required=True, help="DataPreprocessor state saved with save().")
+    parser.add_argument('--model', required=True, help="Model saved with ModelBuilder.save_model().")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on.")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on.")
+    parser.add_argument('--max-batch-size', type=int, default=256, help="Maximum number of records per batch.")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="Maximum time a request waits for a batch to fill.")
+    args = parser.parse_args()
+
+    service = ScoringService.from_files(args.preprocessor, args.model, max_batch_size=args.max_batch_size,
+                                        max_wait_ms=args.max_wait_ms)
+    server = make_server(service, args.host, args.port)
+    print(f"Serving {service.model_name} on http://{args.host}:{server.server_address[1]} "
+          f"(POST /predict, GET /stats, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        print(service.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,16 @@ class DataProcessor:
     
     def __init__(self, data):
         self.data = data
+
+    @classmethod
+    def from_parquet(cls, path, columns=None):
+        """Build a DataProcessor from a Parquet file, loading only the given columns."""
+        return cls(pd.read_parquet(path, columns=columns))
+
+    @classmethod
+    def from_loader(cls, loader):
+        """Build a DataProcessor from the memory-optimised DataFrame of a DataLoader."""
+        return cls(loader.load())
     
     def select_kpi(self, kpi_col):
         """Select the KPI for the A/B test (e.g., TotalClaims, TotalPremium)."""
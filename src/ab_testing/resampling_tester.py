@@ -0,0 +1,130 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+STATISTICS = ('mean', 'median', 'loss_ratio')
+
+# Upper bound on the number of elements of one resampling index matrix (rows x resamples)
+MAX_BATCH_ELEMENTS = 20_000_000
+
+_worker_arrays = None
+
+
+def _init_worker(values_a, values_b):
+    """Keep both groups' values in the worker process so they are sent only once per worker."""
+    global _worker_arrays
+    _worker_arrays = (values_a, values_b)
+
+
+def _statistic(name, samples):
+    """Compute a statistic for each resample. `samples` has shape (resamples, rows, columns)."""
+    if name == 'mean':
+        return samples[..., 0].mean(axis=1)
+    if name == 'median':
+        return np.median(samples[..., 0], axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return samples[..., 0].sum(axis=1) / samples[..., 1].sum(axis=1)  # loss ratio: claims / premium
+
+
+def _resample_batch(kind, statistic, seed, size):
+    """
+    Draw one batch of resamples with a NumPy index matrix and return the differences A - B.
+
+    'permutation' shuffles the pooled rows between the groups; 'bootstrap' draws each group
+    with replacement. Runs in a worker process (or in-process when n_jobs is 1).
+    """
+    values_a, values_b = _worker_arrays
+    n_a, n_b = len(values_a), len(values_b)
+    rng = np.random.default_rng(seed)
+    if kind == 'permutation':
+        pooled = np.concatenate([values_a, values_b])
+        # Random keys partitioned at n_a split every row into a random group A and group B
+        keys = rng.random((size, n_a + n_b), dtype=np.float32)
+        samples = pooled[np.argpartition(keys, n_a - 1, axis=1)]
+        return _statistic(statistic, samples[:, :n_a]) - _statistic(statistic, samples[:, n_a:])
+    index_a = rng.integers(0, n_a, size=(size, n_a), dtype=np.int32)
+    index_b = rng.integers(0, n_b, size=(size, n_b), dtype=np.int32)
+    return _statistic(statistic, values_a[index_a]) - _statistic(statistic, values_b[index_b])
+
+
+class ResamplingTester:
+    """
+    Permutation and bootstrap tests for differences in mean, median and loss ratio between two groups.
+
+    Resamples are drawn in batches from NumPy index matrices, spread over a process pool, and
+    seeded per batch from one random_state so results do not depend on the number of workers.
+    """
+
+    def __init__(self, n_resamples=10000, confidence_level=0.95, batch_size=None, n_jobs=1, random_state=42):
+        self.n_resamples = n_resamples
+        self.confidence_level = confidence_level
+        self.batch_size = batch_size
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def _values(self, group, statistic, kpi, premium):
+        """The KPI (and premium) values of a group, without rows that have a missing value."""
+        columns = [kpi, premium] if statistic == 'loss_ratio' else [kpi]
+        values = group[columns].to_numpy(dtype=float)
+        return values[~np.isnan(values).any(axis=1)]
+
+    def _resample(self, kind, statistic, values_a, values_b):
+        """Run all resamples of one kind and return the array of differences."""
+        batch_size = self.batch_size or max(1, MAX_BATCH_ELEMENTS // (len(values_a) + len(values_b)))
+        sizes = [min(batch_size, self.n_resamples - start) for start in range(0, self.n_resamples, batch_size)]
+        seeds = np.random.SeedSequence([self.random_state, 0 if kind == 'permutation' else 1]).spawn(len(sizes))
+        tasks = [(kind, statistic, seed, size) for seed, size in zip(seeds, sizes)]
+
+        if self.n_jobs == 1:
+            _init_worker(values_a, values_b)
+            results = [_resample_batch(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                     initargs=(values_a, values_b)) as executor:
+                results = list(executor.map(_resample_batch, *zip(*tasks)))
+        return np.concatenate(results)
+
+    def _confidence_interval(self, differences):
+        alpha = 1 - self.confidence_level
+        return tuple(float(q) for q in np.nanquantile(differences, [alpha / 2, 1 - alpha / 2]))
+
+    def _group_values(self, group_a, group_b, statistic, kpi, premium):
+        """Check the arguments and return the values of both groups."""
+        if statistic not in STATISTICS:
+            raise ValueError(f"Unknown statistic '{statistic}'. Expected one of {STATISTICS}.")
+        values_a = self._values(group_a, statistic, kpi, premium)
+        values_b = self._values(group_b, statistic, kpi, premium)
+        if len(values_a) == 0 or len(values_b) == 0:
+            raise ValueError("Both groups must contain at least one row without missing values.")
+        return values_a, values_b
+
+    def permutation_test(self, group_a, group_b, statistic='mean', kpi='TotalClaims', premium='TotalPremium'):
+        """
+        Two-sided permutation test of the difference in a statistic between two groups.
+
+        The p-value comes from permuting rows between the groups; the confidence interval of the
+        difference is the bootstrap percentile interval.
+        """
+        values_a, values_b = self._group_values(group_a, group_b, statistic, kpi, premium)
+        observed = float((_statistic(statistic, values_a[None]) - _statistic(statistic, values_b[None]))[0])
+
+        permuted = self._resample('permutation', statistic, values_a, values_b)
+        p_value = (np.sum(np.abs(permuted) >= abs(observed)) + 1) / (len(permuted) + 1)
+        ci_low, ci_high = self._confidence_interval(self._resample('bootstrap', statistic, values_a, values_b))
+        return {'statistic': statistic, 'difference': observed, 'p_value': float(p_value),
+                'ci_low': ci_low, 'ci_high': ci_high}
+
+    def bootstrap_test(self, group_a, group_b, statistic='mean', kpi='TotalClaims', premium='TotalPremium'):
+        """
+        Bootstrap test of the difference in a statistic between two groups.
+
+        Returns the percentile confidence interval of the difference and a two-sided p-value
+        given by the share of bootstrap differences on the other side of zero.
+        """
+        values_a, values_b = self._group_values(group_a, group_b, statistic, kpi, premium)
+        observed = float((_statistic(statistic, values_a[None]) - _statistic(statistic, values_b[None]))[0])
+
+        differences = self._resample('bootstrap', statistic, values_a, values_b)
+        p_value = min(1.0, 2 * min(np.mean(differences <= 0), np.mean(differences >= 0)))
+        ci_low, ci_high = self._confidence_interval(differences)
+        return {'statistic': statistic, 'difference': observed, 'p_value': float(p_value),
+                'ci_low': ci_low, 'ci_high': ci_high}
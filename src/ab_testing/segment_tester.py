@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+CORRECTIONS = (None, 'bonferroni', 'fdr_bh')
+
+
+def group_statistics(data, feature, kpi):
+    """
+    Compute the sufficient statistics (count, sum, sum of squares) of a KPI per group of a feature.
+
+    Rows with a missing KPI are ignored. One groupby pass over the data.
+    """
+    values = data[kpi].astype(float)
+    frame = pd.DataFrame({'value': values, 'value_sq': values * values}).where(values.notna())
+    grouped = frame.groupby(data[feature], observed=True, sort=True)
+    return pd.DataFrame({
+        'count': grouped['value'].count(),
+        'sum': grouped['value'].sum(),
+        'sum_sq': grouped['value_sq'].sum(),
+    })
+
+
+def welch_t_test(n_a, mean_a, var_a, n_b, mean_b, var_b):
+    """
+    Vectorized Welch t-test from group sizes, means and sample variances.
+
+    Gives the same result as scipy.stats.ttest_ind(a, b, equal_var=False) for every element.
+    Returns arrays of (t statistic, degrees of freedom, two-sided p-value).
+    """
+    n_a, mean_a, var_a, n_b, mean_b, var_b = (
+        np.asarray(x, dtype=float) for x in (n_a, mean_a, var_a, n_b, mean_b, var_b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se_a, se_b = var_a / n_a, var_b / n_b
+        t_stat = (mean_a - mean_b) / np.sqrt(se_a + se_b)
+        df = (se_a + se_b) ** 2 / (se_a ** 2 / (n_a - 1) + se_b ** 2 / (n_b - 1))
+        p_value = 2 * stats.t.sf(np.abs(t_stat), df)
+    return t_stat, df, p_value
+
+
+def welch_t_test_from_stats(n_a, sum_a, sum_sq_a, n_b, sum_b, sum_sq_b):
+    """Vectorized Welch t-test computed from counts, sums and sums of squares (see welch_t_test)."""
+    n_a, sum_a, sum_sq_a, n_b, sum_b, sum_sq_b = (
+        np.asarray(x, dtype=float) for x in (n_a, sum_a, sum_sq_a, n_b, sum_b, sum_sq_b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_a, mean_b = sum_a / n_a, sum_b / n_b
+        var_a = np.maximum(sum_sq_a - sum_a * mean_a, 0) / (n_a - 1)
+        var_b = np.maximum(sum_sq_b - sum_b * mean_b, 0) / (n_b - 1)
+    return welch_t_test(n_a, mean_a, var_a, n_b, mean_b, var_b)
+
+
+def adjust_p_values(p_values, correction='fdr_bh'):
+    """Adjust p-values for multiple testing with 'bonferroni', 'fdr_bh' (Benjamini-Hochberg) or None."""
+    if correction not in CORRECTIONS:
+        raise ValueError(f"Unknown correction '{correction}'. Expected one of {CORRECTIONS}.")
+    p_values = np.asarray(p_values, dtype=float)
+    if correction is None:
+        return p_values
+
+    adjusted = np.full_like(p_values, np.nan)
+    valid = ~np.isnan(p_values)
+    p = p_values[valid]
+    m = len(p)
+    if correction == 'bonferroni':
+        adjusted[valid] = np.minimum(p * m, 1.0)
+    else:
+        order = np.argsort(p)
+        ranked = p[order] * m / np.arange(1, m + 1)
+        # Enforce monotonicity from the largest p-value down
+        ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+        result = np.empty(m)
+        result[order] = np.minimum(ranked, 1.0)
+        adjusted[valid] = result
+    return adjusted
+
+
+class SegmentTester:
+    """Tests a KPI across all groups of a feature from per-group sufficient statistics."""
+
+    def __init__(self, data=None, group_stats=None):
+        """
+        Initialize from raw data, or from precomputed statistics.
+
+        group_stats is an optional callable (feature, kpi) -> DataFrame with 'count', 'sum' and
+        'sum_sq' columns indexed by group, e.g. the lookup of a segment-statistics cube.
+        """
+        if data is None and group_stats is None:
+            raise ValueError("Either data or group_stats must be given.")
+        self.data = data
+        self.group_stats = group_stats
+
+    def statistics(self, feature, kpi):
+        """Return the per-group count, sum and sum of squares of the KPI."""
+        if self.group_stats is not None:
+            return self.group_stats(feature, kpi)
+        if feature not in self.data.columns or kpi not in self.data.columns:
+            raise ValueError(f"Columns '{feature}' and '{kpi}' must exist in the dataset.")
+        return group_statistics(self.data, feature, kpi)
+
+    def _report(self, group_a, group_b, stats_a, stats_b, correction, alpha):
+        t_stat, df, p_value = welch_t_test_from_stats(
+            stats_a['count'], stats_a['sum'], stats_a['sum_sq'],
+            stats_b['count'], stats_b['sum'], stats_b['sum_sq'])
+        p_adjusted = adjust_p_values(p_value, correction)
+        return pd.DataFrame({
+            'group_a': group_a,
+            'group_b': group_b,
+            'n_a': np.asarray(stats_a['count']),
+            'n_b': np.asarray(stats_b['count']),
+            'mean_a': np.asarray(stats_a['sum']) / np.asarray(stats_a['count']),
+            'mean_b': np.asarray(stats_b['sum']) / np.asarray(stats_b['count']),
+            't_stat': t_stat,
+            'df': df,
+            'p_value': p_value,
+            'p_adjusted': p_adjusted,
+            'reject': p_adjusted < alpha,
+        })
+
+    def pairwise_tests(self, feature, kpi, groups=None, correction='fdr_bh', alpha=0.05, min_count=2):
+        """
+        Welch t-test of the KPI for every pair of groups of a feature, with multiple-testing correction.
+
+        :param groups: Optional subset of groups to compare.
+        :param min_count: Groups with fewer observations are left out.
+        """
+        group_stats = self.statistics(feature, kpi)
+        if groups is not None:
+            group_stats = group_stats.loc[group_stats.index.intersection(groups)]
+        group_stats = group_stats[group_stats['count'] >= min_count]
+
+        i, j = np.triu_indices(len(group_stats), k=1)
+        values = group_stats.to_dict('series')
+        stats_a = {name: column.to_numpy()[i] for name, column in values.items()}
+        stats_b = {name: column.to_numpy()[j] for name, column in values.items()}
+        labels = group_stats.index.to_numpy()
+        return self._report(labels[i], labels[j], stats_a, stats_b, correction, alpha)
+
+    def one_vs_rest_tests(self, feature, kpi, correction='fdr_bh', alpha=0.05, min_count=2):
+        """Welch t-test of the KPI for every group of a feature against all other rows."""
+        group_stats = self.statistics(feature, kpi)
+        totals = group_stats.sum()
+        rest = totals - group_stats
+        keep = (group_stats['count'] >= min_count) & (rest['count'] >= min_count)
+        group_stats, rest = group_stats[keep], rest[keep]
+        return self._report(group_stats.index.to_numpy(), 'rest', group_stats, rest, correction, alpha)
@@ -0,0 +1,149 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2_contingency
+from ab_testing.segment_tester import welch_t_test
+
+
+def iter_chunks(path, columns=None, chunksize=250_000):
+    """Yield DataFrame chunks of a CSV file or of the row groups of a Parquet file."""
+    if os.path.splitext(path)[1] == '.parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize, low_memory=False)
+
+
+def merge_moments(moments, chunk_moments):
+    """
+    Merge two tables of running moments ('count', 'mean', 'm2' per group) with Chan's parallel update.
+
+    'm2' is the sum of squared deviations from the mean, as in Welford's algorithm.
+    """
+    index = moments.index.union(chunk_moments.index)
+    a = moments.reindex(index, fill_value=0.0)
+    b = chunk_moments.reindex(index, fill_value=0.0)
+    count = a['count'] + b['count']
+    delta = b['mean'] - a['mean']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(count > 0, b['count'] / count, 0.0)
+        cross = np.where(count > 0, a['count'] * b['count'] / count, 0.0)
+    return pd.DataFrame({
+        'count': count,
+        'mean': a['mean'] + delta * weight,
+        'm2': a['m2'] + b['m2'] + delta ** 2 * cross,
+    }, index=index)
+
+
+def chunk_moments(values, groups):
+    """Per-group count, mean and sum of squared deviations of one chunk."""
+    grouped = values.astype(float).groupby(groups, observed=True).agg(['count', 'mean', 'var'])
+    grouped = grouped[grouped['count'] > 0]
+    return pd.DataFrame({
+        'count': grouped['count'].astype(float),
+        'mean': grouped['mean'],
+        'm2': (grouped['var'] * (grouped['count'] - 1)).fillna(0.0),
+    })
+
+
+class StreamingHypothesisTester:
+    """
+    Out-of-core A/B tests: running moments of KPIs and contingency counts per segment, updated chunk by chunk.
+
+    The p-values equal those of ttest_ind(equal_var=False) and chi2_contingency on the full data,
+    and the state can be saved and updated later with new months of data.
+    """
+
+    def __init__(self, feature, kpis=('TotalClaims',), outcome=None):
+        """
+        :param feature: Column that defines the segments (e.g. Province, PostalCode, Gender).
+        :param kpis: Numeric columns whose per-segment moments are accumulated for t-tests.
+        :param outcome: Optional categorical outcome for chi-squared tests: a column name, or a
+                        callable taking a chunk and returning a Series (e.g. lambda c: c['TotalClaims'] > 0).
+        """
+        self.feature = feature
+        self.kpis = list(kpis)
+        self.outcome = outcome
+        self.moments = {kpi: pd.DataFrame(columns=['count', 'mean', 'm2'], dtype=float) for kpi in self.kpis}
+        self.contingency = pd.DataFrame(dtype=float)
+        self.rows = 0
+
+    def columns(self):
+        """Columns needed from the source file (None if the outcome is computed by a callable)."""
+        if callable(self.outcome):
+            return None
+        return [self.feature] + self.kpis + ([self.outcome] if self.outcome is not None else [])
+
+    def update(self, chunk):
+        """Update the moments and contingency counts with one chunk of rows."""
+        if self.outcome is None and not self.contingency.empty:
+            raise ValueError("The contingency counts were accumulated with an outcome, but none is configured. "
+                             "Pass the outcome to load().")
+        if self.outcome is not None and not callable(self.outcome) and self.outcome not in chunk.columns:
+            raise KeyError(f"Outcome column '{self.outcome}' is missing from the chunk.")
+        groups = chunk[self.feature]
+        for kpi in self.kpis:
+            self.moments[kpi] = merge_moments(self.moments[kpi], chunk_moments(chunk[kpi], groups))
+        if self.outcome is not None:
+            outcome = self.outcome(chunk) if callable(self.outcome) else chunk[self.outcome]
+            counts = pd.crosstab(groups, outcome)
+            self.contingency = self.contingency.add(counts, fill_value=0).fillna(0)
+        self.rows += len(chunk)
+        return self
+
+    def consume(self, path, chunksize=250_000):
+        """Stream a CSV or Parquet file through update()."""
+        for chunk in iter_chunks(path, columns=self.columns(), chunksize=chunksize):
+            self.update(chunk)
+        return self
+
+    def t_test(self, group_a, group_b, kpi=None):
+        """Welch t-test of a KPI between two segments, from the running moments. Returns the p-value."""
+        moments = self.moments[kpi or self.kpis[0]]
+        for group in (group_a, group_b):
+            if group not in moments.index:
+                raise ValueError(f"Segment '{group}' has not been seen for feature '{self.feature}'.")
+        a, b = moments.loc[group_a], moments.loc[group_b]
+        _, _, p_value = welch_t_test(a['count'], a['mean'], a['m2'] / (a['count'] - 1),
+                                     b['count'], b['mean'], b['m2'] / (b['count'] - 1))
+        return float(p_value)
+
+    def chi_squared_test(self, groups=None):
+        """Chi-squared test of independence between the segments and the outcome. Returns the p-value."""
+        if self.outcome is None:
+            raise ValueError("No outcome was configured for chi-squared tests.")
+        table = self.contingency if groups is None else self.contingency.loc[list(groups)]
+        table = table.loc[:, table.sum() > 0]
+        chi2, p_value, _, _ = chi2_contingency(table.to_numpy())
+        return p_value
+
+    def summary(self, kpi=None):
+        """Per-segment count, mean and standard deviation of a KPI."""
+        moments = self.moments[kpi or self.kpis[0]]
+        return pd.DataFrame({
+            'count': moments['count'],
+            'mean': moments['mean'],
+            'std': np.sqrt(moments['m2'] / (moments['count'] - 1)),
+        })
+
+    def save(self, path):
+        """Save the accumulated state so it can be updated with new data later."""
+        joblib.dump({'feature': self.feature, 'kpis': self.kpis,
+                     'outcome': None if callable(self.outcome) else self.outcome, 'moments': self.moments,
+                     'contingency': self.contingency, 'rows': self.rows}, path)
+
+    @classmethod
+    def load(cls, path, outcome=None):
+        """
+        Restore a tester saved with save(). An outcome column is restored; a callable outcome is
+        not saved and has to be given again.
+        """
+        state = joblib.load(path)
+        tester = cls(state['feature'], state['kpis'], outcome=outcome if outcome is not None else state.get('outcome'))
+        tester.moments = state['moments']
+        tester.contingency = state['contingency']
+        tester.rows = state['rows']
+        return tester
@@ -0,0 +1,177 @@
+import os
+import pandas as pd
+from utils.instrumentation import instrumented
+
+# Column types of the MachineLearningRating dataset. The converter's Parquet output uses them as its
+# schema (unlisted columns are stored as plain strings).
+MLR_SCHEMA = {
+    'UnderwrittenCoverID': 'int64',
+    'PolicyID': 'int64',
+    'TransactionMonth': 'timestamp',
+    'IsVATRegistered': 'bool',
+    'Citizenship': 'category',
+    'LegalType': 'category',
+    'Title': 'category',
+    'Language': 'category',
+    'Bank': 'category',
+    'AccountType': 'category',
+    'MaritalStatus': 'category',
+    'Gender': 'category',
+    'Country': 'category',
+    'Province': 'category',
+    'PostalCode': 'int32',
+    'MainCrestaZone': 'category',
+    'SubCrestaZone': 'category',
+    'ItemType': 'category',
+    'mmcode': 'float64',
+    'VehicleType': 'category',
+    'RegistrationYear': 'int16',
+    'make': 'category',
+    'Model': 'category',
+    'Cylinders': 'float32',
+    'cubiccapacity': 'float32',
+    'kilowatts': 'float32',
+    'bodytype': 'category',
+    'NumberOfDoors': 'float32',
+    'CustomValueEstimate': 'float32',
+    'AlarmImmobiliser': 'category',
+    'TrackingDevice': 'category',
+    'NewVehicle': 'category',
+    'WrittenOff': 'category',
+    'Rebuilt': 'category',
+    'Converted': 'category',
+    'CrossBorder': 'category',
+    'NumberOfVehiclesInFleet': 'float32',
+    'SumInsured': 'float32',
+    'TermFrequency': 'category',
+    'CalculatedPremiumPerTerm': 'float32',
+    'ExcessSelected': 'category',
+    'CoverCategory': 'category',
+    'CoverType': 'category',
+    'CoverGroup': 'category',
+    'Section': 'category',
+    'Product': 'category',
+    'StatutoryClass': 'category',
+    'StatutoryRiskType': 'category',
+    'TotalPremium': 'float32',
+    'TotalClaims': 'float32',
+}
+
+# Types applied by DataLoader: the categories and floats of MLR_SCHEMA. Integer columns are downcast
+# to the smallest type that holds their values instead, as are numeric columns that are not listed.
+MLR_DTYPES = {name: dtype for name, dtype in MLR_SCHEMA.items() if dtype == 'category' or dtype.startswith('float')}
+
+DATE_COLUMNS = [name for name, dtype in MLR_SCHEMA.items() if dtype == 'timestamp']
+
+
+class DataLoader:
+    """Loads the MachineLearningRating dataset with memory-optimised dtypes."""
+
+    def __init__(self, path, dtypes=None, columns=None, chunksize=250_000, category_threshold=0.5, verbose=True):
+        """
+        Initialize the loader.
+
+        :param path: Path to the CSV or Parquet file.
+        :param dtypes: Mapping of column name to dtype (defaults to MLR_DTYPES).
+        :param columns: Columns to load (defaults to all columns).
+        :param chunksize: Number of CSV rows read and optimised at a time.
+        :param category_threshold: Object columns whose share of distinct values is below this
+                                   threshold are converted to category.
+        :param verbose: Print the memory report after loading.
+        """
+        self.path = path
+        self.dtypes = MLR_DTYPES if dtypes is None else dtypes
+        self.columns = columns
+        self.chunksize = chunksize
+        self.category_threshold = category_threshold
+        self.verbose = verbose
+        self.memory_report = None
+
+    @instrumented()
+    def load(self):
+        """Load the file, optimise the dtypes chunk by chunk and record the memory report."""
+        if os.path.splitext(self.path)[1] == '.parquet':
+            data = pd.read_parquet(self.path, columns=self.columns)
+            memory_before = memory_usage_mb(data)
+            data = self.optimize_dtypes(data)
+        else:
+            memory_before = 0.0
+            chunks = []
+            categorical = None
+            reader = pd.read_csv(self.path, usecols=self.columns, chunksize=self.chunksize, low_memory=False)
+            for chunk in reader:
+                memory_before += memory_usage_mb(chunk)
+                if categorical is None:
+                    # Decided once, on the first chunk, so that every chunk gets the same dtypes
+                    categorical = self.categorical_columns(chunk)
+                chunks.append(self.optimize_dtypes(chunk, categorical))
+            data = concat_categorical(chunks)
+
+        self.memory_report = {
+            'rows': len(data),
+            'memory_before_mb': memory_before,
+            'memory_after_mb': memory_usage_mb(data),
+        }
+        if self.verbose:
+            print(f"Loaded {len(data):,} rows from {self.path}: "
+                  f"{self.memory_report['memory_before_mb']:.1f} MB -> {self.memory_report['memory_after_mb']:.1f} MB")
+        return data
+
+    def categorical_columns(self, data):
+        """Text columns without a dtype in the map whose share of distinct values is below category_threshold."""
+        if len(data) == 0:
+            return set()
+        return {col for col in data.columns
+                if col not in self.dtypes and col not in DATE_COLUMNS and data[col].dtype == 'object'
+                and data[col].nunique() / len(data) < self.category_threshold}
+
+    def optimize_dtypes(self, data, categorical=None):
+        """
+        Apply the dtype map, parse the date columns and downcast the remaining columns.
+
+        :param categorical: Text columns to convert to category (see categorical_columns; decided on
+                            `data` itself if None).
+        """
+        if categorical is None:
+            categorical = self.categorical_columns(data)
+        for col in data.columns:
+            dtype = self.dtypes.get(col)
+            if col in DATE_COLUMNS:
+                data[col] = pd.to_datetime(data[col], errors='coerce')
+            elif dtype is not None:
+                if dtype.startswith('float'):
+                    data[col] = pd.to_numeric(data[col], errors='coerce').astype(dtype)
+                else:
+                    data[col] = data[col].astype(dtype)
+            elif pd.api.types.is_integer_dtype(data[col]) and not pd.api.types.is_bool_dtype(data[col]):
+                data[col] = pd.to_numeric(data[col], downcast='integer')
+            elif pd.api.types.is_float_dtype(data[col]):
+                data[col] = pd.to_numeric(data[col], downcast='float')
+            elif col in categorical:
+                data[col] = data[col].astype('category')
+        return data
+
+
+def memory_usage_mb(data):
+    """Return the deep memory usage of a DataFrame in megabytes."""
+    return data.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def concat_categorical(chunks):
+    """Concatenate DataFrame chunks, keeping category columns as category with the union of their categories."""
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+
+    for col in chunks[0].columns:
+        if not all(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks):
+            # Chunks may disagree (e.g. category in one, object in another); fall back to object
+            if any(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks):
+                for chunk in chunks:
+                    chunk[col] = chunk[col].astype(object)
+            continue
+        categories = pd.Index(sorted(set().union(*(chunk[col].cat.categories for chunk in chunks)), key=str))
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
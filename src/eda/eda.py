@@ -1,11 +1,66 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from eda.segment_cube import SegmentCube, DIMENSIONS, MEASURES
+from eda.profiler import StreamingProfiler
+from eda.report_renderer import ReportRenderer
+from utils.quantile_sketch import SegmentedQuantileSketch
+from utils.instrumentation import instrumented
 
 class EDA:
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, cube: SegmentCube = None):
         self.data = data
+        self.cube = cube
 
+    @classmethod
+    def from_parquet(cls, path: str, columns=None):
+        """Build an EDA instance from a Parquet file, loading only the given columns."""
+        return cls(pd.read_parquet(path, columns=columns))
+
+    @classmethod
+    def from_loader(cls, loader):
+        """Build an EDA instance from the memory-optimised DataFrame of a DataLoader."""
+        return cls(loader.load())
+
+    @instrumented(rows='data')
+    def build_cube(self, dimensions=None, measures=None, groupings=None, path=None):
+        """
+        Build the segment-statistics cube of the data in one pass, and save it if a path is given.
+
+        Once built (or passed to the constructor), group_by_analysis, geographic_analysis and
+        premium_claim_analysis(by=...) answer from the cube instead of grouping the raw data.
+        """
+        dimensions = dimensions or [col for col in DIMENSIONS if col in self.data.columns]
+        measures = measures or [col for col in MEASURES if col in self.data.columns]
+        self.cube = SegmentCube(dimensions, measures, groupings).update(self.data)
+        if path is not None:
+            self.cube.save(path)
+        return self.cube
+
+    def _from_cube(self, group_column):
+        """True if the cube can answer a group-by on the given column(s)."""
+        columns = [group_column] if isinstance(group_column, str) else list(group_column)
+        return self.cube is not None and set(columns) <= set(self.cube.dimensions)
+
+    @staticmethod
+    def profile_file(path: str, columns=None, chunksize: int = 250_000, sketch_size: int = 2000):
+        """
+        Profile a CSV or Parquet file in one streaming pass without loading it into memory.
+
+        The returned StreamingProfiler gives summary(), missing_values(), covariance() and correlation().
+        """
+        return StreamingProfiler(columns, sketch_size).consume(path, chunksize=chunksize)
+
+    @instrumented(rows='data')
+    def profile(self, chunksize: int = 250_000, sketch_size: int = 2000):
+        """Summary statistics, missing values and correlations of the loaded data in a single pass."""
+        profiler = StreamingProfiler(sketch_size=sketch_size)
+        for start in range(0, len(self.data), chunksize):
+            profiler.update(self.data.iloc[start:start + chunksize])
+        return profiler
+
+    @instrumented(rows='data')
     def data_summary(self):
         """Summarize data by calculating descriptive statistics."""
         return self.data.describe()
@@ -14,6 +69,7 @@ class EDA:
         """Check the structure of the dataset."""
         return self.data.dtypes
 
+    @instrumented(rows='data')
     def check_missing_values(self):
         """Check for missing values and display them in percentage and tabular form."""
         # Calculate total missing values
@@ -33,6 +89,7 @@ class EDA:
         
         return missing_data
 
+    @instrumented(rows='data')
     def univariate_analysis(self, column: str):
         """Perform univariate analysis on a given column."""
         if self.data[column].dtype == 'object':
@@ -40,30 +97,77 @@ class EDA:
         else:
             return self.data[column].hist()
 
-    def bivariate_analysis(self, col1: str, col2: str, hue: str = 'PostalCode'):
+    @instrumented(rows='data')
+    def monthly_change(self, column: str, refresh: bool = False):
+        """
+        Return the month-over-month change feature of a column, computing it only once.
+
+        The feature is kept in self.data as 'MonthlyChange_<column>' and reused by later calls
+        unless refresh is True.
+        """
+        feature = 'MonthlyChange_' + column
+        if refresh or feature not in self.data.columns:
+            self.data[feature] = self.data.groupby('TransactionMonth')[column].diff()
+        return self.data[feature]
+
+    def _plot_sample(self, x: str, y: str, hue: str, max_points: int, max_hue_levels: int, random_state: int):
+        """
+        Rows to scatter: at most max_hue_levels hue levels (the rest grouped as 'Other') and about
+        max_points rows, sampled proportionally from every hue level.
+        """
+        columns = [x, y] + ([hue] if hue else [])
+        plot_data = self.data[columns].dropna(subset=[x, y])
+        if hue:
+            top_levels = plot_data[hue].value_counts().index[:max_hue_levels]
+            levels = plot_data[hue].astype(object)
+            plot_data[hue] = levels.where(levels.isin(top_levels), 'Other')
+        if max_points is None or len(plot_data) <= max_points:
+            return plot_data
+        if not hue:
+            return plot_data.sample(n=max_points, random_state=random_state)
+        return plot_data.groupby(hue).sample(frac=max_points / len(plot_data), random_state=random_state)
+
+    @instrumented(rows='data')
+    def bivariate_analysis(self, col1: str, col2: str, hue: str = 'PostalCode', kind: str = 'scatter',
+                           max_points: int = 50000, max_hue_levels: int = 10, gridsize: int = 60,
+                           random_state: int = 42):
         """
         Perform bivariate analysis between two columns (e.g., TotalPremium and TotalClaims), 
         with an optional categorical column (e.g., PostalCode) to color or facet the scatter plot.
+
+        The monthly-change features are computed once and cached in self.data. kind='scatter'
+        draws a stratified sample of at most max_points rows colored by the max_hue_levels most
+        frequent hue levels (max_points=None plots every row); kind='hexbin' aggregates all rows
+        into a 2D histogram and ignores hue.
         """
-        # Calculate monthly changes for col1 and col2
-        self.data['MonthlyChange_' + col1] = self.data.groupby('TransactionMonth')[col1].diff()
-        self.data['MonthlyChange_' + col2] = self.data.groupby('TransactionMonth')[col2].diff()
-        
-        # Plotting the scatter plot
+        if kind not in ('scatter', 'hexbin'):
+            raise ValueError(f"Unknown kind '{kind}'. Expected 'scatter' or 'hexbin'.")
+        x, y = 'MonthlyChange_' + col1, 'MonthlyChange_' + col2
+        # Calculate monthly changes for col1 and col2 (cached after the first call)
+        self.monthly_change(col1)
+        self.monthly_change(col2)
+
         plt.figure(figsize=(10, 6))
-        sns.scatterplot(
-            data=self.data,  # Pass the DataFrame here
-            x='MonthlyChange_' + col1, 
-            y='MonthlyChange_' + col2, 
-            hue=hue,  # Coloring by PostalCode or any other categorical column
-            palette='coolwarm'
-        )
-        plt.title(f"Monthly Changes in {col1} vs {col2} by {hue}")
+        if kind == 'hexbin':
+            plot_data = self.data[[x, y]].dropna()
+            plt.hexbin(plot_data[x], plot_data[y], gridsize=gridsize, bins='log', mincnt=1, cmap='viridis')
+            plt.colorbar(label='Count (log scale)')
+            plt.title(f"Monthly Changes in {col1} vs {col2}")
+        else:
+            sns.scatterplot(
+                data=self._plot_sample(x, y, hue, max_points, max_hue_levels, random_state),
+                x=x,
+                y=y,
+                hue=hue,  # Coloring by PostalCode or any other categorical column
+                palette='coolwarm'
+            )
+            plt.title(f"Monthly Changes in {col1} vs {col2} by {hue}")
         plt.xlabel(f"Monthly Change in {col1}")
         plt.ylabel(f"Monthly Change in {col2}")
         plt.show()
 
 
+    @instrumented(rows='data')
     def correlation_matrix(self):
         """
         Generate a correlation matrix for numerical features only.
@@ -72,21 +176,26 @@ class EDA:
         numeric_data = self.data.select_dtypes(include=['number'])
         return numeric_data.corr()
     
-    def plot_correlation_matrix(self):
+    @instrumented(rows='data')
+    def plot_correlation_matrix(self, max_annotated_columns: int = 15):
         """
         Plot the correlation matrix using a heatmap.
+
+        Cells are annotated only when the matrix has at most max_annotated_columns columns.
         """
         corr_matrix = self.correlation_matrix()
         plt.figure(figsize=(10, 8))
-        sns.heatmap(corr_matrix, annot=True, cmap='coolwarm')
+        sns.heatmap(corr_matrix, annot=len(corr_matrix) <= max_annotated_columns, cmap='coolwarm')
         plt.title('Correlation Matrix')
         plt.show()
 
+    @instrumented(rows='data')
     def outlier_detection(self, column: str):
         """Detect outliers in a given numerical column."""
         sns.boxplot(x=self.data[column])
         plt.show()
 
+    @instrumented(rows='data')
     def visualize_data(self):
         """Produce creative and insightful visualizations."""
         self.data['TotalPremium'].hist(bins=50)
@@ -103,6 +212,16 @@ class EDA:
 
         self.plot_correlation_matrix()
 
+    @instrumented(rows='data')
+    def render_report(self, output_dir: str, columns=None, n_jobs: int = 1, **kwargs):
+        """
+        Render the EDA charts (histograms, box plots, bar charts and the correlation heatmap) to
+        image files without a display, reusing charts whose input data has not changed.
+
+        Keyword arguments are passed to ReportRenderer. Returns a table of the rendered charts.
+        """
+        return ReportRenderer(self.data, output_dir, n_jobs=n_jobs, **kwargs).render(columns)
+
     # Additional functions
 
     def parse_dates(self):
@@ -111,18 +230,55 @@ class EDA:
         self.data['TransactionYear'] = self.data['TransactionMonth'].dt.year
         self.data['TransactionMonthOnly'] = self.data['TransactionMonth'].dt.month
 
-    def encode_categorical(self):
-        """Encode categorical features."""
+    @instrumented(rows='data')
+    def encode_categorical(self, encoding: str = 'onehot'):
+        """
+        Encode categorical features.
+
+        'onehot' creates dense dummy columns, 'sparse' creates the same dummies as pandas sparse
+        columns and 'codes' replaces each column by its integer category codes.
+        """
         categorical_cols = ['LegalType', 'VehicleType', 'CoverType', 'make', 'Model']
-        self.data = pd.get_dummies(self.data, columns=categorical_cols)
+        if encoding == 'onehot':
+            self.data = pd.get_dummies(self.data, columns=categorical_cols)
+        elif encoding == 'sparse':
+            self.data = pd.get_dummies(self.data, columns=categorical_cols, sparse=True, dtype='uint8')
+        elif encoding == 'codes':
+            for col in categorical_cols:
+                self.data[col] = self.data[col].astype('category').cat.codes
+        else:
+            raise ValueError(f"Unknown encoding '{encoding}'. Expected 'onehot', 'sparse' or 'codes'.")
 
-    def premium_claim_analysis(self):
-        """Create new features for premium and claims analysis."""
+    @instrumented(rows='data')
+    def premium_claim_analysis(self, by=None):
+        """
+        Create new features for premium and claims analysis.
+
+        With `by`, returns the total premium, total claims and claim-to-premium ratio per segment
+        of that column instead, from the cube when it has been built.
+        """
+        if by is not None:
+            if self._from_cube(by):
+                totals = self.cube.query(by, ['TotalPremium', 'TotalClaims'])['sum']
+            else:
+                totals = self.data.groupby(by, observed=True)[['TotalPremium', 'TotalClaims']].sum()
+            totals['ClaimToPremiumRatio'] = totals['TotalClaims'] / totals['TotalPremium']
+            return totals
         self.data['ClaimToPremiumRatio'] = self.data['TotalClaims'] / self.data['TotalPremium']
         return self.data[['TotalPremium', 'TotalClaims', 'ClaimToPremiumRatio']].describe()
 
+    @instrumented(rows='data')
     def group_by_analysis(self, group_column):
-        """Group data by a specific column and calculate mean statistics for numeric columns."""
+        """
+        Group data by a specific column and calculate mean statistics for numeric columns.
+
+        When the column is a dimension of the cube and every numeric column is a measure of the
+        cube, the means are returned from the cube.
+        """
+        numeric_cols = list(self.data.select_dtypes(include='number').columns)
+        if self._from_cube(group_column) and set(numeric_cols) <= set(self.cube.measures):
+            return self.cube.mean(group_column, numeric_cols)[numeric_cols]
+
         # Check if the column exists or was one-hot encoded
         original_col = group_column
         if group_column not in self.data.columns:
@@ -133,9 +289,6 @@ class EDA:
             else:
                 group_column = encoded_cols  # Use the one-hot encoded columns for grouping
 
-        # Select numeric columns only
-        numeric_cols = self.data.select_dtypes(include='number').columns
-
         # Perform group by operation
         try:
             if isinstance(group_column, list):  # Handling one-hot encoded columns
@@ -146,20 +299,42 @@ class EDA:
             raise KeyError(f"Grouping or mean calculation failed. Error: {str(e)}")
 
 
+    @instrumented(rows='data')
     def sum_insured_analysis(self):
         """Analyze SumInsured and CustomValueEstimate correlation with TotalPremium."""
         return self.data[['SumInsured', 'CustomValueEstimate', 'TotalPremium']].corr()
 
-    def filter_outliers(self, column: str):
-        """Filter out outliers based on a column using the IQR method."""
-        Q1 = self.data[column].quantile(0.25)
-        Q3 = self.data[column].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
+    @instrumented(rows='data')
+    def filter_outliers(self, column: str, by: str = None, sketch: SegmentedQuantileSketch = None):
+        """
+        Filter out outliers based on a column using the IQR method.
+
+        With `by` (e.g. 'Province') the IQR fences are computed per segment. With `by` or a
+        prebuilt `sketch` (e.g. merged from streamed chunks), Q1 and Q3 come from quantile
+        sketches instead of sorting the column; rows of segments the sketch has not seen are kept.
+        """
+        if by is None and sketch is None:
+            Q1 = self.data[column].quantile(0.25)
+            Q3 = self.data[column].quantile(0.75)
+            IQR = Q3 - Q1
+            lower_bound = Q1 - 1.5 * IQR
+            upper_bound = Q3 + 1.5 * IQR
+            return self.data[(self.data[column] >= lower_bound) & (self.data[column] <= upper_bound)]
+
+        sketch = sketch or SegmentedQuantileSketch([column], by=by).update(self.data)
+        lower_bound, upper_bound = (bound[column] for bound in sketch.iqr_bounds())
+        if sketch.by is not None:
+            segments = self.data[sketch.by]
+            lower_bound = segments.map(lower_bound).astype(float).fillna(-np.inf)
+            upper_bound = segments.map(upper_bound).astype(float).fillna(np.inf)
         return self.data[(self.data[column] >= lower_bound) & (self.data[column] <= upper_bound)]
 
+    @instrumented(rows='data')
     def geographic_analysis(self):
         """Analyze premium trends by geographic columns."""
-        return self.data.groupby('Province')[['TotalPremium', 'TotalClaims']].mean().plot(kind='bar')
+        if self._from_cube('Province'):
+            means = self.cube.mean('Province', ['TotalPremium', 'TotalClaims'])
+        else:
+            means = self.data.groupby('Province')[['TotalPremium', 'TotalClaims']].mean()
+        return means.plot(kind='bar')
 
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from utils.quantile_sketch import QuantileSketch
+
+PERCENTILES = (0.25, 0.5, 0.75)
+
+
+class StreamingProfiler:
+    """
+    One-pass profile of a dataset that is read chunk by chunk.
+
+    Keeps null counts of every column and, for numeric columns, exact counts, means, variances,
+    min and max, approximate quantiles from a QuantileSketch and the co-moments needed for the
+    covariance and correlation matrices (pairwise-complete, like DataFrame.cov and corr).
+    Memory does not grow with the number of rows, so files larger than RAM can be profiled.
+    """
+
+    def __init__(self, columns=None, sketch_size=2000, random_state=42):
+        """
+        :param columns: Columns to profile (all columns of the first chunk if None).
+        :param sketch_size: Size k of the quantile sketches; larger is more accurate.
+        """
+        self.columns = list(columns) if columns is not None else None
+        self.sketch_size = sketch_size
+        self.random_state = random_state
+        self.numeric_columns = None
+        self.rows = 0
+        self.nulls = None
+        self.sketches = {}
+        self._shift = None
+        self._pair_count = self._pair_sum = self._pair_sum_sq = self._cross = None
+
+    def _start(self, chunk):
+        """Fix the profiled and numeric columns from the first chunk."""
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        self.numeric_columns = list(chunk[self.columns].select_dtypes(include='number').columns)
+        self.nulls = pd.Series(0, index=self.columns, dtype='int64')
+        self.sketches = {col: QuantileSketch(self.sketch_size, self.random_state + i)
+                         for i, col in enumerate(self.numeric_columns)}
+        # Values are shifted by the first chunk's means so the sums of squares stay well-conditioned
+        self._shift = chunk[self.numeric_columns].apply(pd.to_numeric, errors='coerce').mean().fillna(0).to_numpy()
+        size = len(self.numeric_columns)
+        self._pair_count, self._pair_sum, self._pair_sum_sq, self._cross = (np.zeros((size, size)) for _ in range(4))
+
+    def update(self, chunk):
+        """Add one chunk of rows to the profile."""
+        if self.numeric_columns is None:
+            self._start(chunk)
+        self.rows += len(chunk)
+        self.nulls += chunk[self.columns].isnull().sum()
+
+        values = chunk[self.numeric_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        for i, col in enumerate(self.numeric_columns):
+            self.sketches[col].update(values[:, i])
+
+        present = ~np.isnan(values)
+        mask = present.astype(float)
+        centered = np.where(present, values - self._shift, 0.0)
+        # Entry [i, j] sums over the rows where both column i and column j are present
+        self._pair_count += mask.T @ mask
+        self._pair_sum += centered.T @ mask
+        self._pair_sum_sq += (centered * centered).T @ mask
+        self._cross += centered.T @ centered
+        return self
+
+    def consume(self, path, chunksize=250_000):
+        """Profile a CSV or Parquet file, streamed in chunks (or Parquet row-group batches)."""
+        from ab_testing.streaming_tester import iter_chunks
+
+        for chunk in iter_chunks(path, columns=self.columns, chunksize=chunksize):
+            self.update(chunk)
+        return self
+
+    def summary(self, percentiles=PERCENTILES):
+        """Describe-style table (count, mean, std, min, percentiles, max) of the numeric columns."""
+        count = np.diag(self._pair_count)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_shifted = np.diag(self._pair_sum) / count
+            variance = (np.diag(self._pair_sum_sq) - count * mean_shifted ** 2) / (count - 1)
+        summary = {
+            'count': count,
+            'mean': mean_shifted + self._shift,
+            'std': np.sqrt(np.maximum(variance, 0)),
+            'min': [self.sketches[col].min for col in self.numeric_columns],
+        }
+        quantiles = np.array([self.sketches[col].quantile(percentiles) for col in self.numeric_columns])
+        for i, q in enumerate(percentiles):
+            summary[f"{q:.0%}"] = quantiles[:, i] if len(quantiles) else []
+        summary['max'] = [self.sketches[col].max for col in self.numeric_columns]
+        return pd.DataFrame(summary, index=self.numeric_columns).T
+
+    def missing_values(self):
+        """Missing values per column in count and percentage, like EDA.check_missing_values."""
+        missing_data = pd.DataFrame({
+            'Missing Values': self.nulls,
+            'Percentage': self.nulls / self.rows * 100,
+        })
+        return missing_data[missing_data['Missing Values'] > 0].sort_values(by='Percentage', ascending=False)
+
+    def covariance(self):
+        """Pairwise-complete covariance matrix of the numeric columns."""
+        n = self._pair_count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (self._cross - self._pair_sum * self._pair_sum.T / n) / (n - 1)
+        return pd.DataFrame(cov, index=self.numeric_columns, columns=self.numeric_columns)
+
+    def correlation(self):
+        """Pairwise-complete Pearson correlation matrix of the numeric columns."""
+        n = self._pair_count
+        sum_x, sum_y = self._pair_sum, self._pair_sum.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = self._cross - sum_x * sum_y / n
+            var_x = self._pair_sum_sq - sum_x ** 2 / n
+            var_y = self._pair_sum_sq.T - sum_y ** 2 / n
+            corr = np.clip(cov / np.sqrt(var_x * var_y), -1, 1)
+        return pd.DataFrame(corr, index=self.numeric_columns, columns=self.numeric_columns)
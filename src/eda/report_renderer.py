@@ -0,0 +1,148 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from utils.fingerprint import frame_fingerprint, object_fingerprint
+
+
+def histogram_aggregate(values, bins=50):
+    """Bin counts and edges of the finite values of a numeric column."""
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+    counts, edges = np.histogram(values, bins=bins)
+    return {'counts': counts, 'edges': edges}
+
+
+def boxplot_aggregate(values, max_fliers=500):
+    """
+    Box plot statistics (quartiles, 1.5 IQR whiskers) of a numeric column, in the format of
+    Axes.bxp. At most `max_fliers` outliers, evenly spaced in rank and including the extremes,
+    are kept for drawing.
+    """
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    fliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    if len(fliers) > max_fliers:
+        fliers = np.sort(fliers)[np.linspace(0, len(fliers) - 1, max_fliers).astype(int)]
+    return {'med': median, 'q1': q1, 'q3': q3, 'whislo': inside.min(), 'whishi': inside.max(),
+            'fliers': fliers, 'label': ''}
+
+
+def _render_chart(task):
+    """Draw one chart from its aggregate with the Agg canvas and save it. Runs in a worker process."""
+    path, kind, title, payload, dpi = task
+    fig = Figure(figsize=(10, 8) if kind == 'heatmap' else (10, 6), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if kind == 'histogram':
+        ax.stairs(payload['counts'], payload['edges'], fill=True)
+        ax.set_ylabel('Frequency')
+    elif kind == 'boxplot':
+        ax.bxp([payload], showfliers=True)
+    elif kind == 'bar':
+        ax.bar([str(label) for label in payload.index], payload.to_numpy())
+        ax.tick_params(axis='x', labelrotation=90)
+    elif kind == 'heatmap':
+        import seaborn as sns
+
+        corr, annot = payload
+        sns.heatmap(corr, annot=annot, cmap='coolwarm', ax=ax)
+    ax.set_title(title)
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+
+class ReportRenderer:
+    """
+    Batch, headless rendering of the EDA charts to image files.
+
+    Every chart (histogram, box plot and bar chart per column, correlation heatmap) is drawn
+    from a small pre-computed aggregate instead of the raw rows, with matplotlib's Agg canvas
+    so no display or notebook is needed. Charts are drawn in a process pool and cached on disk
+    by the fingerprint of their input columns and settings: unchanged charts are not redrawn.
+    """
+
+    def __init__(self, data, output_dir, bins=50, max_categories=20, max_annotated_columns=15,
+                 image_format='png', dpi=100, n_jobs=1):
+        """
+        :param bins: Number of histogram bins.
+        :param max_categories: Number of most frequent levels shown in bar charts.
+        :param max_annotated_columns: The heatmap cells are annotated only up to this many columns.
+        """
+        self.data = data
+        self.output_dir = output_dir
+        self.bins = bins
+        self.max_categories = max_categories
+        self.max_annotated_columns = max_annotated_columns
+        self.image_format = image_format
+        self.dpi = dpi
+        self.n_jobs = n_jobs
+
+    def _path(self, name, key):
+        return os.path.join(self.output_dir, f"{name}_{key[:12]}.{self.image_format}")
+
+    def _charts(self, columns):
+        """List (name, kind, title, input columns) for every chart of the report."""
+        numeric_cols = list(self.data[columns].select_dtypes(include='number').columns)
+        categorical_cols = self.data[columns].select_dtypes(include=['object', 'category']).columns
+        charts = []
+        for col in numeric_cols:
+            charts.append((f"hist_{col}", 'histogram', f"Distribution of {col}", [col]))
+            charts.append((f"box_{col}", 'boxplot', f"Outliers of {col}", [col]))
+        for col in categorical_cols:
+            charts.append((f"bar_{col}", 'bar', f"Most frequent values of {col}", [col]))
+        if len(numeric_cols) > 1:
+            charts.append(('correlation_matrix', 'heatmap', 'Correlation Matrix', numeric_cols))
+        return charts
+
+    def _aggregate(self, kind, columns):
+        """Compute the small aggregate a chart is drawn from."""
+        if kind == 'histogram':
+            return histogram_aggregate(self.data[columns[0]].to_numpy(dtype=float), self.bins)
+        if kind == 'boxplot':
+            return boxplot_aggregate(self.data[columns[0]].to_numpy(dtype=float))
+        if kind == 'bar':
+            return self.data[columns[0]].value_counts().head(self.max_categories)
+        corr = self.data[columns].corr()
+        return corr, len(corr) <= self.max_annotated_columns
+
+    def render(self, columns=None):
+        """
+        Render every chart of the report that is not cached yet.
+
+        Returns a DataFrame with the chart name, kind, image path and whether it came from the cache.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        columns = list(columns) if columns is not None else list(self.data.columns)
+        settings = (self.bins, self.max_categories, self.max_annotated_columns, self.dpi)
+
+        # Each column is hashed once and the chart keys are built from the column hashes
+        fingerprints = {col: frame_fingerprint(self.data[col]) for col in columns}
+
+        records, tasks = [], []
+        for name, kind, title, chart_columns in self._charts(columns):
+            key = object_fingerprint((kind, title, [fingerprints[col] for col in chart_columns], settings))
+            path = self._path(name, key)
+            cached = os.path.exists(path)
+            if not cached:
+                payload = self._aggregate(kind, chart_columns)
+                if payload is None:
+                    continue
+                tasks.append((path, kind, title, payload, self.dpi))
+            records.append({'chart': name, 'kind': kind, 'path': path, 'cached': cached})
+
+        if self.n_jobs == 1 or len(tasks) <= 1:
+            for task in tasks:
+                _render_chart(task)
+        else:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                list(executor.map(_render_chart, tasks))
+        return pd.DataFrame(records, columns=['chart', 'kind', 'path', 'cached'])
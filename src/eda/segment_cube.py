@@ -0,0 +1,165 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ['Province', 'PostalCode', 'VehicleType', 'CoverType', 'make', 'TransactionMonth']
+MEASURES = ['TotalPremium', 'TotalClaims', 'SumInsured', 'CalculatedPremiumPerTerm', 'CustomValueEstimate']
+STATISTICS = ['count', 'sum', 'sum_sq', 'min', 'max']
+
+# How the statistics of two cells of the same segment are merged
+_MERGE = {'count': 'sum', 'sum': 'sum', 'sum_sq': 'sum', 'min': 'min', 'max': 'max'}
+
+
+def aggregate_cells(data, keys, measures):
+    """
+    Count, sum, sum of squares, min and max of every measure per segment of `keys`.
+
+    Returns a DataFrame indexed by the segments with (statistic, measure) columns. Rows with a
+    missing key form their own segment, so roll-ups keep every row; SegmentCube.query leaves
+    those segments out by default.
+    """
+    values = data[measures].astype(float)
+    grouped = values.groupby([data[key] for key in keys], observed=True, dropna=False, sort=False)
+    squares = (values * values).groupby([data[key] for key in keys], observed=True, dropna=False, sort=False)
+    return pd.concat({
+        'count': grouped.count().astype(float),
+        'sum': grouped.sum(),
+        'sum_sq': squares.sum(),
+        'min': grouped.min(),
+        'max': grouped.max(),
+    }, axis=1)
+
+
+def reduce_cells(cells, levels):
+    """Combine the statistics of all cells that share the same values of the given index levels."""
+    return pd.concat({
+        stat: getattr(cells[stat].groupby(level=levels, dropna=False, sort=False), how)()
+        for stat, how in _MERGE.items()
+    }, axis=1)
+
+
+def merge_cells(cells, other):
+    """Merge two tables of segment statistics, e.g. those of two chunks of data."""
+    if cells is None:
+        return other
+    return reduce_cells(pd.concat([cells, other]), list(range(cells.index.nlevels)))
+
+
+class SegmentCube:
+    """
+    Precomputed segment statistics of KPI columns for dashboards, EDA and A/B tests.
+
+    Count, sum, sum of squares, min and max of every measure are kept per segment of every
+    grouping (by default each dimension on its own). The cube is built chunk by chunk in one
+    pass over the data, saved to disk, and answers group-by queries without touching the data.
+    """
+
+    def __init__(self, dimensions=None, measures=None, groupings=None):
+        """
+        :param dimensions: Segment columns (Province, PostalCode, VehicleType, CoverType, make, TransactionMonth).
+        :param measures: Numeric columns whose statistics are kept.
+        :param groupings: Combinations of dimensions to precompute, e.g. [('Province', 'TransactionMonth')].
+                          Every single dimension is always included.
+        """
+        self.dimensions = list(dimensions or DIMENSIONS)
+        self.measures = list(measures or MEASURES)
+        self.groupings = [(dimension,) for dimension in self.dimensions]
+        for grouping in groupings or []:
+            grouping = tuple(grouping)
+            unknown = set(grouping) - set(self.dimensions)
+            if unknown:
+                raise ValueError(f"Groupings use unknown dimensions: {sorted(unknown)}.")
+            if grouping not in self.groupings:
+                self.groupings.append(grouping)
+        self.cells = {grouping: None for grouping in self.groupings}
+        self.rows = 0
+        self._cache = {}
+
+    def update(self, chunk):
+        """Add one chunk of rows to every grouping of the cube."""
+        missing = [column for column in self.dimensions + self.measures if column not in chunk.columns]
+        if missing:
+            raise KeyError(f"Columns {missing} are missing from the data.")
+        for grouping in self.groupings:
+            self.cells[grouping] = merge_cells(self.cells[grouping],
+                                               aggregate_cells(chunk, list(grouping), self.measures))
+        self.rows += len(chunk)
+        self._cache = {}
+        return self
+
+    def consume(self, path, chunksize=250_000):
+        """Build the cube from a CSV or Parquet file, streamed in chunks."""
+        from ab_testing.streaming_tester import iter_chunks
+
+        for chunk in iter_chunks(path, columns=self.dimensions + self.measures, chunksize=chunksize):
+            self.update(chunk)
+        return self
+
+    def query(self, by, measures=None, dropna=True):
+        """
+        Segment statistics of the measures grouped by one dimension or a tuple of dimensions.
+
+        Served from a precomputed grouping, or rolled up from the smallest grouping that contains
+        all requested dimensions. Returns (statistic, measure) columns indexed by segment.
+
+        :param dropna: Leave out segments with a missing key, like DataFrame.groupby.
+        """
+        by = (by,) if isinstance(by, str) else tuple(by)
+        if by not in self._cache:
+            self._cache[by] = self._rollup(by)
+        cells = self._cache[by]
+        if dropna:
+            index = cells.index.to_frame(index=False)
+            cells = cells[index.notna().all(axis=1).to_numpy()]
+        if measures is None:
+            return cells
+        measures = [measures] if isinstance(measures, str) else list(measures)
+        return cells.loc[:, (slice(None), measures)]
+
+    def _rollup(self, by):
+        candidates = [grouping for grouping in self.groupings if set(by) <= set(grouping)]
+        if not candidates:
+            raise KeyError(f"No precomputed grouping of the cube contains {list(by)}.")
+        source = min(candidates, key=lambda grouping: len(self.cells[grouping]))
+        cells = self.cells[source]
+        if cells is None:
+            raise ValueError("The cube is empty. Call update() or consume() first.")
+        if source != by:
+            cells = reduce_cells(cells, list(by))
+        return cells.sort_index()
+
+    def summary(self, by, measures=None):
+        """Per-segment count, mean, standard deviation, min and max of the measures."""
+        cells = self.query(by, measures)
+        count, total = cells['count'], cells['sum']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = total / count
+            variance = (cells['sum_sq'] - total * mean).clip(lower=0) / (count - 1)
+        return pd.concat({'count': count, 'mean': mean, 'std': np.sqrt(variance),
+                          'min': cells['min'], 'max': cells['max']}, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+    def mean(self, by, measures=None):
+        """Per-segment mean of the measures."""
+        cells = self.query(by, measures)
+        return cells['sum'] / cells['count']
+
+    def group_stats(self, feature, kpi):
+        """Count, sum and sum of squares of a KPI per segment; the `group_stats` hook of SegmentTester."""
+        cells = self.query(feature, kpi)
+        stats = pd.DataFrame({stat: cells[(stat, kpi)] for stat in ('count', 'sum', 'sum_sq')})
+        return stats[stats.index.notna() & (stats['count'] > 0)]
+
+    def save(self, path):
+        """Save the cube, including the roll-ups computed so far."""
+        joblib.dump({'dimensions': self.dimensions, 'measures': self.measures, 'groupings': self.groupings,
+                     'cells': self.cells, 'rows': self.rows, 'cache': self._cache}, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a cube saved with save()."""
+        state = joblib.load(path)
+        cube = cls(state['dimensions'], state['measures'], state['groupings'])
+        cube.cells = state['cells']
+        cube.rows = state['rows']
+        cube._cache = state['cache']
+        return cube
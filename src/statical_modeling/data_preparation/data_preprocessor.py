@@ -1,16 +1,51 @@
 import pandas as pd
 import numpy as np
+import joblib
 from sklearn.impute import SimpleImputer
 from sklearn.model_selection import train_test_split
+from utils.quantile_sketch import SegmentedQuantileSketch
+from utils.instrumentation import instrumented
+
+ENCODINGS = ('onehot', 'sparse', 'codes', 'category')
+
+
+def _encode(data, categories, encoding):
+    """Encode the categorical columns of `data` (modified in place) against a fixed category vocabulary."""
+    for col, values in categories.items():
+        data[col] = pd.Categorical(data[col], categories=values)
+        if encoding == 'codes':
+            data[col] = data[col].cat.codes
+    if encoding == 'onehot':
+        data = pd.get_dummies(data, columns=list(categories), drop_first=True)
+    elif encoding == 'sparse':
+        data = pd.get_dummies(data, columns=list(categories), drop_first=True, sparse=True, dtype=np.uint8)
+    return data
+
 
 class DataPreprocessor:
     def __init__(self, data):
         self.data = data
+        self.outlier_caps = None
+        self.imputation = None
+        self.categories = None
+        self.encoding = None
+        self.state = None  # Fitted preprocessing state, filled in by fit()
+
+    @classmethod
+    def from_parquet(cls, path, columns=None):
+        """Build a DataPreprocessor from a Parquet file, loading only the given columns."""
+        return cls(pd.read_parquet(path, columns=columns))
+
+    @classmethod
+    def from_loader(cls, loader):
+        """Build a DataPreprocessor from the memory-optimised DataFrame of a DataLoader."""
+        return cls(loader.load())
 
+    @instrumented(rows='data')
     def handle_missing_data(self):
         """Handle missing data for numeric and categorical features separately."""
         numeric_cols = self.data.select_dtypes(include=['number']).columns
-        categorical_cols = self.data.select_dtypes(include=['object']).columns
+        categorical_cols = self.data.select_dtypes(include=['object', 'category']).columns
         datetime_cols = self.data.select_dtypes(include=['datetime64[ns]']).columns
 
         # Identify columns with all missing values
@@ -22,12 +57,20 @@ class DataPreprocessor:
             print(f"Dropping columns with all missing values: {cols_to_drop.tolist()}")
             self.data.drop(columns=cols_to_drop, inplace=True)
             numeric_cols = numeric_cols[~missing_all_numeric]  # Update numeric_cols
+        else:
+            cols_to_drop = pd.Index([])
+        self.imputation = {
+            'dropped_columns': cols_to_drop.tolist(),
+            'numeric_means': {},
+            'categorical_modes': {},
+        }
 
         # Impute numeric columns with the mean
         if len(numeric_cols) > 0:
             imputer_numeric = SimpleImputer(strategy='mean')
             transformed_numeric = imputer_numeric.fit_transform(self.data[numeric_cols])
             self.data[numeric_cols] = pd.DataFrame(transformed_numeric, columns=numeric_cols, index=self.data.index)
+            self.imputation['numeric_means'] = dict(zip(numeric_cols, imputer_numeric.statistics_))
 
         # Impute categorical columns with the most frequent value
         if len(categorical_cols) > 0:
@@ -37,6 +80,7 @@ class DataPreprocessor:
                 columns=categorical_cols,
                 index=self.data.index
             )
+            self.imputation['categorical_modes'] = dict(zip(categorical_cols, imputer_categorical.statistics_))
 
         # Handle datetime columns (forward fill)
         if len(datetime_cols) > 0:
@@ -50,6 +94,7 @@ class DataPreprocessor:
 #         self.handle_missing_data()  # Re-handle missing data after replacing inf
 # # df_new = df[np.isfinite(df).all(1)]
 
+    @instrumented(rows='data')
     def handle_infinity(self):
         """Replace infinite values with NaN in numeric columns and re-handle missing data."""
         # Apply replacement only on numeric columns
@@ -64,12 +109,61 @@ class DataPreprocessor:
         
         self.handle_missing_data()  # Re-handle missing data after replacing inf
 
-    def cap_outliers(self):
-        """Cap extreme outliers at the 99th percentile."""
-        for col in self.data.select_dtypes(include=['number']).columns:
-            cap_value = self.data[col].quantile(0.99)
-            self.data[col] = self.data[col].apply(lambda x: min(x, cap_value))
+    @instrumented(rows='data')
+    def cap_outliers(self, upper_quantile=0.99, lower_quantile=None, caps=None, by=None, sketch=None):
+        """
+        Cap extreme outliers of all numeric columns at once (by default at the 99th percentile).
 
+        The quantiles of every numeric column are computed in a single call and all columns are
+        clipped together. Pass `caps` (as returned by an earlier call) to reuse fitted caps.
+
+        With `by` (e.g. 'Province') every segment gets its own caps. With `by` or a prebuilt
+        SegmentedQuantileSketch (e.g. merged from streamed chunks) the quantiles come from the
+        sketches instead of sorting each column; rows of unseen segments are not capped.
+
+        Returns a dict with the 'lower' and 'upper' caps per column (None when not applied), as
+        Series, or as DataFrames indexed by segment together with the segment column 'by'.
+        """
+        if caps is None:
+            if upper_quantile is None and lower_quantile is None:
+                raise ValueError("At least one of 'lower_quantile' and 'upper_quantile' must be given.")
+            numeric_cols = self.data.select_dtypes(include=['number']).columns
+            if by is not None:
+                numeric_cols = numeric_cols.drop(by, errors='ignore')
+            if by is None and sketch is None:
+                quantiles = [q for q in (lower_quantile, upper_quantile) if q is not None]
+                bounds = self.data[numeric_cols].quantile(quantiles)
+                caps = {
+                    'lower': bounds.loc[lower_quantile] if lower_quantile is not None else None,
+                    'upper': bounds.loc[upper_quantile] if upper_quantile is not None else None,
+                }
+            else:
+                sketch = sketch or SegmentedQuantileSketch(numeric_cols, by=by).update(self.data)
+                caps = {
+                    'lower': sketch.quantile(lower_quantile) if lower_quantile is not None else None,
+                    'upper': sketch.quantile(upper_quantile) if upper_quantile is not None else None,
+                    'by': sketch.by,
+                }
+
+        # Only clip the fitted columns that are still present
+        fitted = caps['upper'] if caps['upper'] is not None else caps['lower']
+        fitted_columns = fitted.columns if caps.get('by') is not None else fitted.index
+        columns = [col for col in fitted_columns if col in self.data.columns]
+        lower = caps['lower'][columns] if caps['lower'] is not None else None
+        upper = caps['upper'][columns] if caps['upper'] is not None else None
+        if caps.get('by') is not None:
+            # Look up the caps of every row's segment
+            segments = self.data[caps['by']].to_numpy()
+            lower = lower.reindex(segments).set_axis(self.data.index) if lower is not None else None
+            upper = upper.reindex(segments).set_axis(self.data.index) if upper is not None else None
+            self.data[columns] = self.data[columns].clip(lower=lower, upper=upper)
+        else:
+            self.data[columns] = self.data[columns].clip(lower=lower, upper=upper, axis=1)
+
+        self.outlier_caps = caps
+        return caps
+
+    @instrumented(rows='data')
     def feature_engineering(self):
         """Create new features that could be relevant to TotalPremium and TotalClaims."""
         # Handle division by zero: Replace zeros in 'TotalPremium' with NaN or a small number to avoid inf
@@ -78,19 +172,111 @@ class DataPreprocessor:
         
         # Optionally, you can also impute or handle NaN values in this new column
         # For example, replacing NaNs with 0 if necessary:
-        self.data['Claims_to_Premium'].fillna(0, inplace=True)
+        self.data['Claims_to_Premium'] = self.data['Claims_to_Premium'].fillna(0)
+
+    @instrumented(rows='data')
+    def encode_categorical_data(self, encoding='onehot'):
+        """
+        Encode categorical columns.
 
-    def encode_categorical_data(self):
-        """One-hot encoding for categorical columns."""
-        categorical_columns = self.data.select_dtypes(include=['object']).columns
-        self.data = pd.get_dummies(self.data, columns=categorical_columns, drop_first=True)
+        encoding:
+        - 'onehot': dense one-hot columns (pd.get_dummies, first level dropped).
+        - 'sparse': the same one-hot columns stored as pandas sparse uint8 columns; ModelBuilder
+          passes them to the models as a scipy sparse matrix.
+        - 'codes': one integer category-code column per categorical column.
+        - 'category': pandas category columns, for XGBoost's native categorical support.
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding '{encoding}'. Expected one of {ENCODINGS}.")
+        categorical_columns = self.data.select_dtypes(include=['object', 'category']).columns
+        # Remember the category vocabulary so that new data can be encoded to the same columns
+        self.categories = {col: pd.Categorical(self.data[col]).categories.tolist() for col in categorical_columns}
+        self.encoding = encoding
+        self.data = _encode(self.data, self.categories, encoding)
 
-    def preprocess(self):
+    @instrumented(rows='data')
+    def preprocess(self, encoding='onehot'):
         """Full preprocessing pipeline including handling infinity and outliers."""
         self.handle_infinity()  # Handle inf values and missing data
         self.cap_outliers()  # Cap extreme outliers
         self.feature_engineering()
-        self.encode_categorical_data()
+        self.encode_categorical_data(encoding=encoding)
+
+    @instrumented(rows='data')
+    def fit(self, encoding='onehot'):
+        """
+        Run the full preprocessing pipeline on the data and keep the fitted state.
+
+        The state holds the imputation means and modes, the outlier caps, the category
+        vocabulary and the output columns, so that transform() can preprocess new data
+        to exactly the same schema without refitting.
+        """
+        input_columns = self.data.columns.tolist()
+        self.preprocess(encoding=encoding)
+        self.state = {
+            'input_columns': input_columns,
+            'imputation': self.imputation,
+            'outlier_caps': self.outlier_caps,
+            'categories': self.categories,
+            'encoding': self.encoding,
+            'columns': self.data.columns.tolist(),
+        }
+        return self
+
+    @instrumented()
+    def transform(self, data):
+        """
+        Preprocess new data with the fitted state and return it with the fitted columns.
+
+        Numeric input columns missing from `data` are filled with their fitted mean and
+        categories not seen during fit are encoded as all zeros.
+        """
+        if self.state is None:
+            raise ValueError("DataPreprocessor has not been fitted. Call fit() or load() first.")
+
+        state = self.state
+        imputation = state['imputation']
+        numeric_cols = list(imputation['numeric_means'])
+        categorical_cols = list(imputation['categorical_modes'])
+
+        data = data.drop(columns=[col for col in imputation['dropped_columns'] if col in data.columns])
+        data = data.reindex(columns=[col for col in state['input_columns'] if col not in imputation['dropped_columns']])
+
+        # Impute with the fitted means and modes
+        data[numeric_cols] = (data[numeric_cols].astype(float)
+                              .replace([np.inf, -np.inf], np.nan)
+                              .fillna(imputation['numeric_means']))
+        data[categorical_cols] = data[categorical_cols].astype(object).fillna(imputation['categorical_modes'])
+        datetime_cols = data.select_dtypes(include=['datetime64[ns]']).columns
+        if len(datetime_cols) > 0:
+            data[datetime_cols] = data[datetime_cols].ffill()
+
+        # Cap outliers and create features exactly as during fit
+        transformer = DataPreprocessor(data)
+        transformer.cap_outliers(caps=state['outlier_caps'])
+        transformer.feature_engineering()
+        data = transformer.data
+
+        # Encode with the fitted vocabulary and align to the fitted columns
+        data = _encode(data, state['categories'], state['encoding'])
+        return data.reindex(columns=state['columns'], fill_value=0)
+
+    def save(self, path):
+        """Save the fitted preprocessing state to disk."""
+        if self.state is None:
+            raise ValueError("DataPreprocessor has not been fitted. Call fit() first.")
+        joblib.dump(self.state, path)
+
+    @classmethod
+    def load(cls, path):
+        """Create a fitted DataPreprocessor, without data, from a state saved with save()."""
+        preprocessor = cls(None)
+        preprocessor.state = joblib.load(path)
+        preprocessor.imputation = preprocessor.state['imputation']
+        preprocessor.outlier_caps = preprocessor.state['outlier_caps']
+        preprocessor.categories = preprocessor.state['categories']
+        preprocessor.encoding = preprocessor.state['encoding']
+        return preprocessor
 
     def split_data(self, target_column, test_size=0.2):
         """Split the data into training and testing sets."""
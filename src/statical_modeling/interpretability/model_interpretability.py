@@ -1,21 +1,210 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
 import shap
 import lime
 import lime.lime_tabular
+from utils.fingerprint import frame_fingerprint, object_fingerprint
+
+_worker_explainer = None
+_worker_lime = None
+
+
+def _init_shap_worker(model, background):
+    """Build the TreeExplainer once per worker process."""
+    global _worker_explainer
+    _worker_explainer = _tree_explainer(model, background)
+
+
+def _shap_chunk(X_chunk):
+    """Compute the SHAP values of one chunk of rows. Runs inside a worker process."""
+    return _worker_explainer.shap_values(X_chunk)
+
+
+def _tree_explainer(model, background):
+    """Path-dependent TreeExplainer, or an interventional one when a background sample is given."""
+    if background is None:
+        return shap.TreeExplainer(model)
+    return shap.TreeExplainer(model, data=background, feature_perturbation='interventional')
+
+
+class _BatchPredictor:
+    """Picklable predict function that predicts LIME's perturbed samples in fixed-size batches."""
+
+    def __init__(self, model, columns, batch_size):
+        self.model = model
+        self.columns = columns
+        self.batch_size = batch_size
+
+    def __call__(self, samples):
+        return np.concatenate([
+            self.model.predict(pd.DataFrame(samples[start:start + self.batch_size], columns=self.columns))
+            for start in range(0, len(samples), self.batch_size)
+        ])
+
+
+def _init_lime_worker(explainer, predict_fn):
+    """Keep the LIME explainer and predict function in the worker process."""
+    global _worker_lime
+    _worker_lime = (explainer, predict_fn)
+
+
+def _explain_row(task):
+    """Explain one policy with LIME and return one record per feature. Runs inside a worker process."""
+    label, values, num_features, num_samples, seed = task
+    shared_explainer, predict_fn = _worker_lime
+    # A per-row seed makes each explanation independent of the worker it runs on. It is set on a
+    # shallow copy so the shared explainer (the caller's own one when n_jobs == 1) is left as it was.
+    random_state = np.random.RandomState(seed)
+    explainer = copy.copy(shared_explainer)
+    explainer.base = copy.copy(shared_explainer.base)
+    explainer.random_state = explainer.base.random_state = random_state
+    if explainer.discretizer is not None:
+        explainer.discretizer = copy.copy(shared_explainer.discretizer)
+        explainer.discretizer.random_state = random_state
+    exp = explainer.explain_instance(values, predict_fn, num_features=num_features, num_samples=num_samples)
+    prediction = float(np.ravel(exp.predicted_value)[0]) if exp.predicted_value is not None else None
+    return [{
+        'row': label,
+        'rank': rank,
+        'feature': feature,
+        'weight': weight,
+        'prediction': prediction,
+        'intercept': float(np.ravel(exp.intercept[exp.dummy_label] if isinstance(exp.intercept, dict) else exp.intercept)[0]),
+        'local_r2': exp.score,
+    } for rank, (feature, weight) in enumerate(exp.as_list(), start=1)]
+
+
+def stratified_sample(X, n, strata, random_state=42):
+    """
+    Sample about `n` rows of X, proportionally from every stratum.
+
+    `strata` is a Series of labels aligned with X; every non-empty stratum keeps at least one row.
+    """
+    if n is None or n >= len(X):
+        return X
+    fraction = n / len(X)
+    sampled = strata.groupby(strata, observed=True, group_keys=False).apply(
+        lambda group: group.sample(n=max(1, int(round(len(group) * fraction))), random_state=random_state))
+    return X.loc[sampled.index.sort_values()]
+
 
 class ModelInterpretability:
     def __init__(self, model, X_test):
         self.model = model
         self.X_test = X_test
+        self.lime_explainer = None
+
+    def _strata(self, stratify, bins=10):
+        """Strata labels for sampling: a column of X_test, or deciles of the model's predictions."""
+        if stratify is not None:
+            return self.X_test[stratify]
+        predictions = pd.Series(self.model.predict(self.X_test), index=self.X_test.index)
+        return pd.qcut(predictions, q=bins, labels=False, duplicates='drop')
+
+    def compute_shap_values(self, sample_size=None, background_size=None, stratify=None, chunk_size=10000,
+                            n_jobs=1, cache_dir=None, random_state=42):
+        """
+        Compute SHAP values without plotting.
+
+        :param sample_size: Number of rows of X_test to explain, sampled stratified (all rows if None).
+        :param background_size: Size of a stratified background sample for interventional SHAP
+                                (tree path-dependent SHAP without background if None).
+        :param stratify: Column of X_test to stratify on (deciles of the predictions if None).
+        :param chunk_size: Number of rows explained per task.
+        :param n_jobs: Number of worker processes the chunks are spread over.
+        :param cache_dir: Directory where SHAP values are cached, keyed by model, data and settings.
+        :param random_state: Seed of the row and background samples.
+        :return: Tuple of the SHAP values array and the explained rows of X_test.
+        """
+        cache_file = None
+        if cache_dir is not None:
+            key = object_fingerprint((object_fingerprint(self.model), frame_fingerprint(self.X_test), sample_size,
+                                      background_size, stratify, random_state))
+            cache_file = os.path.join(cache_dir, f"shap_{key}.npz")
+            if os.path.exists(cache_file):
+                cached = np.load(cache_file, allow_pickle=False)
+                return cached['shap_values'], self.X_test.iloc[cached['rows']]
+
+        strata = self._strata(stratify) if sample_size is not None or background_size is not None else None
+        X = stratified_sample(self.X_test, sample_size, strata, random_state) if sample_size else self.X_test
+        background = (stratified_sample(self.X_test, background_size, strata, random_state + 1)
+                      if background_size else None)
+
+        chunks = [X.iloc[start:start + chunk_size] for start in range(0, len(X), chunk_size)]
+        if n_jobs == 1 or len(chunks) <= 1:
+            explainer = _tree_explainer(self.model, background)
+            results = [explainer.shap_values(chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_shap_worker,
+                                     initargs=(self.model, background)) as executor:
+                results = list(executor.map(_shap_chunk, chunks))
+        shap_values = np.vstack(results) if results else np.empty((0, X.shape[1]))
+
+        if cache_file is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.savez(cache_file, shap_values=shap_values, rows=self.X_test.index.get_indexer(X.index))
+        return shap_values, X
+
+    def shap_feature_importance(self, **kwargs):
+        """Global feature importance: mean absolute SHAP value per feature, largest first."""
+        shap_values, X = self.compute_shap_values(**kwargs)
+        importance = pd.Series(np.abs(shap_values).mean(axis=0), index=X.columns, name='mean_abs_shap')
+        return importance.sort_values(ascending=False)
+
+    def shap_analysis(self, **kwargs):
+        """SHAP analysis to interpret the model. Keyword arguments are passed to compute_shap_values."""
+        shap_values, X = self.compute_shap_values(**kwargs)
+        shap.summary_plot(shap_values, X)
+
+    def build_lime_explainer(self, training_data=None, random_state=42):
+        """Build the LIME explainer once (on X_test unless other training data is given) and keep it."""
+        training_data = self.X_test if training_data is None else training_data
+        self.lime_explainer = lime.lime_tabular.LimeTabularExplainer(
+            training_data.values, mode="regression", feature_names=list(training_data.columns),
+            random_state=random_state)
+        return self.lime_explainer
+
+    def explain_policies(self, rows=None, num_features=5, num_samples=5000, n_jobs=1,
+                         predict_batch_size=1000, random_state=42):
+        """
+        Explain many policies with LIME and return the explanations as a DataFrame.
+
+        The explainer is built once and the rows are spread over a process pool. The perturbed
+        samples of each policy are predicted in vectorized batches of `predict_batch_size` rows,
+        which bounds the size of the frames passed to the model.
+        Every feature of every explanation is one record (row label, rank, feature condition,
+        weight, model prediction, local intercept and local R2); use `.to_json(orient='records')`
+        for a JSON report.
+
+        :param rows: Index labels of X_test to explain (all rows if None).
+        :param num_features: Number of features per explanation.
+        :param num_samples: Number of perturbed samples LIME draws per policy.
+        :param n_jobs: Number of worker processes.
+        :param predict_batch_size: Number of perturbed samples predicted per call of the model
+                                   (one call per policy if it is at least `num_samples`).
+        """
+        explainer = self.lime_explainer or self.build_lime_explainer(random_state=random_state)
+        predict_fn = _BatchPredictor(self.model, self.X_test.columns, predict_batch_size)
+        X = self.X_test if rows is None else self.X_test.loc[rows]
+        tasks = [(label, values, num_features, num_samples, random_state + i)
+                 for i, (label, values) in enumerate(zip(X.index, X.values))]
 
-    def shap_analysis(self):
-        """SHAP analysis to interpret the model."""
-        explainer = shap.TreeExplainer(self.model)
-        shap_values = explainer.shap_values(self.X_test)
-        shap.summary_plot(shap_values, self.X_test)
+        if n_jobs == 1:
+            _init_lime_worker(explainer, predict_fn)
+            records = [_explain_row(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_lime_worker,
+                                     initargs=(explainer, predict_fn)) as executor:
+                records = list(executor.map(_explain_row, tasks, chunksize=max(1, len(tasks) // (n_jobs * 4))))
+        return pd.DataFrame([record for row_records in records for record in row_records],
+                            columns=['row', 'rank', 'feature', 'weight', 'prediction', 'intercept', 'local_r2'])
 
     def lime_analysis(self):
         """LIME analysis for model interpretability."""
-        explainer = lime.lime_tabular.LimeTabularExplainer(self.X_test.values, mode="regression", feature_names=self.X_test.columns)
+        explainer = self.lime_explainer or self.build_lime_explainer()
         i = 0  # Analyze the first instance in the test set
         exp = explainer.explain_instance(self.X_test.values[i], self.model.predict, num_features=5)
         exp.show_in_notebook(show_table=True)
@@ -1,53 +1,353 @@
+import copy
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import joblib
+import pandas as pd
+from scipy import sparse
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 import xgboost as xgb
+from statical_modeling.registry.artifact_registry import artifact_key
+from statical_modeling.modeling.sufficient_stats_regression import SufficientStatsRegression, fit_streaming
+from utils.instrumentation import instrumentation, instrumented, peak_rss_mb
 from sklearn.metrics import mean_squared_error, r2_score
 from sklearn.linear_model import LinearRegression
 
+# Training method of each model, used by train_models
+TRAINERS = {
+    'Linear Regression': 'train_linear_regression',
+    'Random Forest': 'train_random_forest',
+    'XGBoost': 'train_xgboost',
+}
+
+_worker_builder = None
+
+
+def _init_worker(builder):
+    """Keep the ModelBuilder in the worker process so its data is sent only once per worker."""
+    global _worker_builder
+    _worker_builder = builder
+
+
+def _train_in_worker(name, n_jobs):
+    """
+    Train one model in a worker process and measure its wall time and CPU time.
+
+    A worker may train several models, and the peak RSS is the high-water mark of the whole
+    worker process so far, so it is reported as such rather than attributed to this model.
+    """
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    with instrumentation.collect() as records:
+        getattr(_worker_builder, TRAINERS[name])(n_jobs=n_jobs)
+    metrics = {
+        'Wall Time (s)': time.perf_counter() - wall_start,
+        'CPU Time (s)': time.process_time() - cpu_start,
+        'Worker Peak RSS (MB)': peak_rss_mb(),
+        'Threads': n_jobs,
+    }
+    return name, _worker_builder.models[name], _worker_builder.model_keys.get(name), metrics, records
+
+
+def prepare_features(X, model_name):
+    """
+    Convert encoded features into a form the given model accepts.
+
+    Category columns are kept for XGBoost (native categorical support) and replaced by their
+    integer codes for the other models. Frames with pandas sparse columns (the 'sparse'
+    encoding of DataPreprocessor) are converted to a scipy CSR matrix, dense columns first.
+    """
+    category_cols = X.select_dtypes(include='category').columns
+    if len(category_cols) > 0 and model_name != 'XGBoost':
+        X = X.assign(**{col: X[col].cat.codes for col in category_cols})
+
+    sparse_cols = [col for col in X.columns if isinstance(X[col].dtype, pd.SparseDtype)]
+    if sparse_cols:
+        dense_cols = [col for col in X.columns if col not in set(sparse_cols)]
+        return sparse.hstack([
+            sparse.csr_matrix(X[dense_cols].to_numpy(dtype=float)),
+            X[sparse_cols].sparse.to_coo(),
+        ], format='csr')
+    return X
 
 
 class ModelBuilder:
-    def __init__(self, X_train, X_test, y_train, y_test):
+    def __init__(self, X_train, X_test, y_train, y_test, registry=None):
+        """
+        :param registry: Optional ArtifactRegistry. Trained models and evaluation results are then
+                         stored under a hash of the data, features and hyperparameters, and
+                         training on unchanged inputs loads the stored model instead.
+        """
         self.X_train = X_train
         self.X_test = X_test
         self.y_train = y_train
         self.y_test = y_test
+        self.registry = registry
         self.models = {}
+        self.model_keys = {}
         self.results = {}
+        self._data_key = None
+        self._linear_pending = []  # Rows of updates the Linear Regression was not part of
+
+    def _fit_or_load(self, model_name, params, fit):
+        """Train a model with fit(), or load it from the registry when it was trained on the same inputs."""
+        if self.registry is None:
+            self.models[model_name] = fit()
+            return
+        if self._data_key is None:
+            self._data_key = artifact_key(self.X_train, self.y_train, list(self.X_train.columns))
+        key = artifact_key(self._data_key, model_name, params)
+        self.models[model_name] = self.registry.get_or_create(
+            key, fit, kind='model', metadata={'model_name': model_name, 'params': params})
+        self.model_keys[model_name] = key
 
+    def _prepare_features(self, X, model_name):
+        """Convert encoded features into a form the given model accepts (see prepare_features)."""
+        return prepare_features(X, model_name)
 
-    def train_linear_regression(self):
+    @instrumented(rows='X_train')
+    def train_linear_regression(self, n_jobs=None):
         # Drop rows with missing values
         X_train_clean = self.X_train.dropna()
         y_train_clean = self.y_train[self.X_train.index.isin(X_train_clean.index)]
         
-        lr_model = LinearRegression()
-        lr_model.fit(X_train_clean, y_train_clean)
-        self.models['Linear Regression'] = lr_model
+        def fit():
+            lr_model = LinearRegression(n_jobs=n_jobs)
+            return lr_model.fit(self._prepare_features(X_train_clean, 'Linear Regression'), y_train_clean)
+        self._fit_or_load('Linear Regression', {}, fit)
+        self._linear_pending = []
 
+    @instrumented()
+    def train_linear_regression_streaming(self, paths, target_column, feature_columns=None, preprocessor=None,
+                                          chunksize=250_000, n_jobs=1):
+        """
+        Train the Linear Regression on CSV or Parquet files streamed in chunks (see fit_streaming),
+        without loading the data or making a dense copy of it.
 
-        
-    def train_random_forest(self):
-        """Train a Random Forest model."""
-        rf_model = RandomForestRegressor(random_state=42)
-        rf_model.fit(self.X_train, self.y_train)
-        self.models['Random Forest'] = rf_model
-
-    def train_xgboost(self):
-        """Train an XGBoost model."""
-        xgb_model = xgb.XGBRegressor(random_state=42)
-        xgb_model.fit(self.X_train, self.y_train)
-        self.models['XGBoost'] = xgb_model
-
-    def evaluate_models(self):
-        """Evaluate the models and store the results."""
-        for name, model in self.models.items():
-            predictions = model.predict(self.X_test)
-            mse = mean_squared_error(self.y_test, predictions)
-            r2 = r2_score(self.y_test, predictions)
-            self.results[name] = {'MSE': mse, 'R2 Score': r2}
+        The model is a SufficientStatsRegression; its summary() lists the coefficients with their
+        standard errors.
+        """
+        self.models['Linear Regression'] = fit_streaming(paths, target_column, feature_columns=feature_columns,
+                                                         preprocessor=preprocessor, chunksize=chunksize, n_jobs=n_jobs)
+        self.model_keys.pop('Linear Regression', None)
+        self._linear_pending = []
+
+    @instrumented(rows='X_train')
+    def train_random_forest(self, n_jobs=None, params=None):
+        """Train a Random Forest model, optionally with tuned hyperparameters."""
+        params = {'random_state': 42, **(params or {})}
+
+        def fit():
+            rf_model = RandomForestRegressor(**{'n_jobs': n_jobs, **params})
+            return rf_model.fit(self._prepare_features(self.X_train, 'Random Forest'), self.y_train)
+        self._fit_or_load('Random Forest', params, fit)
+
+    @instrumented(rows='X_train')
+    def train_xgboost(self, n_jobs=None, params=None):
+        """Train an XGBoost model, optionally with tuned hyperparameters."""
+        # Use XGBoost's native categorical support when the features contain category columns
+        enable_categorical = len(self.X_train.select_dtypes(include='category').columns) > 0
+        params = {'random_state': 42, 'enable_categorical': enable_categorical, **(params or {})}
+
+        def fit():
+            xgb_model = xgb.XGBRegressor(**{'n_jobs': n_jobs, **params})
+            return xgb_model.fit(self._prepare_features(self.X_train, 'XGBoost'), self.y_train)
+        self._fit_or_load('XGBoost', params, fit)
+
+    @instrumented(rows='X_train')
+    def update_models(self, X_new, y_new, model_names=None, n_new_trees=50, n_boost_rounds=50, history_rows=0):
+        """
+        Update trained models with new rows (e.g. a new TransactionMonth) at a cost proportional to the new data.
+
+        - XGBoost continues boosting from the previous booster for `n_boost_rounds` rounds.
+        - Random Forest adds `n_new_trees` trees fitted on the new rows (warm_start).
+        - Linear Regression adds the new rows to its XᵀX and Xᵀy sufficient statistics and
+          re-solves. A LinearRegression trained by train_linear_regression is first converted
+          once, from the current training rows, to a SufficientStatsRegression. When it is not
+          among `model_names` it is converted all the same, since those rows are dropped
+          afterwards, and the new rows are kept until it is updated next.
+
+        The training history is not kept: the Linear Regression holds only its sufficient
+        statistics and the tree models already contain what they learned from earlier rows.
+        Afterwards X_train and y_train refer to the new rows, or with `history_rows` to a sliding
+        window of the most recent rows, so later full retraining uses that window. The update
+        times are recorded in self.results as 'Update Time (s)'.
+
+        :param history_rows: Number of most recent rows (earlier and new) to keep as the training set.
+        """
+        model_names = list(model_names or self.models)
+        unknown = [name for name in model_names if name not in self.models]
+        if unknown:
+            raise ValueError(f"Model(s) {unknown} have not been trained.")
+
+        linear = self.models.get('Linear Regression')
+        if linear is not None and 'Linear Regression' not in model_names:
+            if not isinstance(linear, SufficientStatsRegression):
+                self.models['Linear Regression'] = self._sufficient_stats_regression()
+            self._linear_pending.append((X_new, y_new))
+
+        for name in model_names:
+            start = time.perf_counter()
+            model = self.models[name]
+            updates = [(X_new, y_new)]
+            if name == 'XGBoost':
+                def update(model=model):
+                    params = {**model.get_params(), 'n_estimators': n_boost_rounds}
+                    return xgb.XGBRegressor(**params).fit(self._prepare_features(X_new, name), y_new,
+                                                          xgb_model=model.get_booster())
+            elif name == 'Random Forest':
+                def update(model=model):
+                    # Copy so the previous version (e.g. a registry artifact) is left unchanged
+                    model = copy.deepcopy(model)
+                    model.set_params(warm_start=True, n_estimators=model.n_estimators + n_new_trees)
+                    return model.fit(self._prepare_features(X_new, name), y_new)
+            else:
+                updates = self._linear_pending + updates
+
+                def update(model=model, updates=updates):
+                    if not isinstance(model, SufficientStatsRegression):
+                        model = self._sufficient_stats_regression()
+                    else:
+                        model = copy.deepcopy(model)
+                    for X_rows, y_rows in updates:
+                        X_clean = X_rows.dropna()
+                        model.partial_fit(self._prepare_features(X_clean, name),
+                                          y_rows[X_rows.index.isin(X_clean.index)])
+                    return model
+
+            if self.registry is not None and name in self.model_keys:
+                key = artifact_key(self.model_keys[name], *[part for rows in updates for part in rows],
+                                   n_new_trees, n_boost_rounds)
+                self.models[name] = self.registry.get_or_create(key, update, kind='model',
+                                                                metadata={'model_name': name, 'update_of': self.model_keys[name]})
+                self.model_keys[name] = key
+            else:
+                self.models[name] = update()
+            if name == 'Linear Regression':
+                self._linear_pending = []
+            self.results.setdefault(name, {})['Update Time (s)'] = time.perf_counter() - start
+
+        # Keep a bounded window instead of copying the whole history on every update
+        kept = max(0, history_rows - len(X_new))
+        if kept > 0:
+            self.X_train = pd.concat([self.X_train.iloc[-kept:], X_new])
+            self.y_train = pd.concat([self.y_train.iloc[-kept:], y_new])
+        else:
+            self.X_train = X_new.iloc[-history_rows:] if history_rows else X_new
+            self.y_train = y_new.iloc[-history_rows:] if history_rows else y_new
+        self._data_key = None
+
+    def _sufficient_stats_regression(self):
+        """Fit a SufficientStatsRegression on the current training rows, as train_linear_regression does."""
+        X_clean = self.X_train.dropna()
+        return SufficientStatsRegression().fit(self._prepare_features(X_clean, 'Linear Regression'),
+                                               self.y_train[self.X_train.index.isin(X_clean.index)])
+
+    def tune_model(self, model_name, method='hyperband', n_candidates=27, **tuner_kwargs):
+        """
+        Tune the hyperparameters of 'XGBoost' or 'Random Forest' on the training set and retrain
+        the model with the best parameters found.
+
+        Extra keyword arguments are passed to HyperparameterTuner (e.g. n_splits, n_jobs,
+        results_path to resume a search, time_budget in seconds).
+        """
+        from statical_modeling.tuning.hyperparameter_tuner import HyperparameterTuner
+
+        tuner = HyperparameterTuner(self.X_train, self.y_train, model_name=model_name, **tuner_kwargs)
+        best_params = tuner.search(method=method, n_candidates=n_candidates)
+        getattr(self, TRAINERS[model_name])(params=best_params)
+        self.results.setdefault(model_name, {}).update({'Tuned Params': best_params, 'CV MSE': tuner.best_score_})
+        return tuner
+
+    def allocate_threads(self, model_names, n_jobs=None):
+        """
+        Split a total core budget between the models.
+
+        Linear Regression gets a single thread; the remaining cores are shared equally by the
+        tree ensembles, with at least one thread per model.
+        """
+        budget = n_jobs or os.cpu_count() or 1
+        heavy = [name for name in model_names if name != 'Linear Regression']
+        light_threads = 1 if 'Linear Regression' in model_names else 0
+        heavy_threads = max(1, (budget - light_threads) // len(heavy)) if heavy else 0
+        return {name: heavy_threads if name in heavy else 1 for name in model_names}
+
+    @instrumented(rows='X_train')
+    def train_models(self, model_names=None, n_jobs=None, model_threads=None):
+        """
+        Train several models concurrently under a total core budget.
+
+        Each model is fitted in its own worker process with its own thread count, so the cycle
+        takes about as long as the slowest model. Wall time, CPU time, thread count and the peak
+        RSS of the worker process so far are recorded in self.results for each model.
+
+        :param model_names: Models to train (defaults to all of TRAINERS).
+        :param n_jobs: Total number of cores to use (defaults to all CPUs).
+        :param model_threads: Optional dict overriding the number of threads per model.
+        """
+        model_names = list(model_names or TRAINERS)
+        unknown = [name for name in model_names if name not in TRAINERS]
+        if unknown:
+            raise ValueError(f"Unknown model(s) {unknown}. Expected any of {list(TRAINERS)}.")
+
+        threads = self.allocate_threads(model_names, n_jobs)
+        threads.update(model_threads or {})
+        max_workers = min(len(model_names), n_jobs or os.cpu_count() or 1)
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(self,)) as executor:
+            futures = [executor.submit(_train_in_worker, name, threads[name]) for name in model_names]
+            for future in futures:
+                name, model, key, metrics, records = future.result()
+                instrumentation.add(records)
+                self.models[name] = model
+                if name == 'Linear Regression':
+                    self._linear_pending = []
+                if key is not None:
+                    self.model_keys[name] = key
+                self.results.setdefault(name, {}).update(metrics)
+
+    @instrumented(rows='X_test')
+    def evaluate_models(self, n_jobs=None):
+        """Evaluate the models, predicting with up to `n_jobs` models at once, and store the results."""
+        def score(name, model):
+            predictions = model.predict(self._prepare_features(self.X_test, name))
+            return mean_squared_error(self.y_test, predictions), r2_score(self.y_test, predictions)
+
+        def evaluate(name, model):
+            if name not in self.model_keys:
+                return (name,) + score(name, model)
+            # Stored models are evaluated once per test set
+            key = artifact_key(self.model_keys[name], self.X_test, self.y_test)
+            return (name,) + tuple(self.registry.get_or_create(key, lambda: score(name, model), kind='results',
+                                                               metadata={'model_name': name}))
+
+        with ThreadPoolExecutor(max_workers=n_jobs or len(self.models) or 1) as executor:
+            evaluations = list(executor.map(lambda item: evaluate(*item), self.models.items()))
+
+        for name, mse, r2 in evaluations:
+            self.results.setdefault(name, {}).update({'MSE': mse, 'R2 Score': r2})
+
+    def save_model(self, model_name, path):
+        """Save a trained model together with its name, e.g. for the scoring service."""
+        if model_name not in self.models:
+            raise ValueError(f"Model '{model_name}' has not been trained.")
+        joblib.dump({'model_name': model_name, 'model': self.models[model_name]}, path)
+
+    @staticmethod
+    def load_model(path):
+        """Load a model saved with save_model(). Returns (model_name, model)."""
+        saved = joblib.load(path)
+        return saved['model_name'], saved['model']
 
     def display_evaluation(self):
-        """Print evaluation metrics for each model."""
+        """Print evaluation metrics and training costs, as far as they are available, for each model."""
         for name, metrics in self.results.items():
-            print(f"{name} - MSE: {metrics['MSE']:.4f}, R2 Score: {metrics['R2 Score']:.4f}")
+            parts = []
+            if 'MSE' in metrics:
+                parts.append(f"MSE: {metrics['MSE']:.4f}, R2 Score: {metrics['R2 Score']:.4f}")
+            if 'Wall Time (s)' in metrics:
+                parts.append(f"Wall Time: {metrics['Wall Time (s)']:.2f}s, CPU Time: {metrics['CPU Time (s)']:.2f}s")
+                if metrics['Worker Peak RSS (MB)'] is not None:
+                    parts.append(f"Worker Peak RSS: {metrics['Worker Peak RSS (MB)']:.1f} MB")
+            if parts:
+                print(f"{name} - {', '.join(parts)}")
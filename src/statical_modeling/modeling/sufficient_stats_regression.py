@@ -0,0 +1,220 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+from utils.instrumentation import instrumentation
+
+_worker_options = None
+
+
+def _design_matrix(X):
+    """Float feature matrix with a leading intercept column (dense or CSR)."""
+    if sparse.issparse(X):
+        return sparse.hstack([np.ones((X.shape[0], 1)), X], format='csr')
+    X = X.to_numpy(dtype=float) if isinstance(X, pd.DataFrame) else np.asarray(X, dtype=float)
+    return np.hstack([np.ones((len(X), 1)), X])
+
+
+class SufficientStatsRegression:
+    """
+    Ordinary least squares fitted from the sufficient statistics XᵀX, Xᵀy and yᵀy.
+
+    update() adds a batch of rows to the statistics in O(rows * features²) and merge() adds the
+    statistics of another model (e.g. one accumulated in another process), so the model can be
+    fitted on data streamed in chunks or updated with new data (e.g. a new TransactionMonth)
+    without revisiting earlier rows. solve() solves the normal equations with a least-squares
+    solver, which gives the same minimum-norm solution as LinearRegression when features are
+    collinear, and computes the coefficient standard errors from σ²(XᵀX)⁻¹.
+    """
+
+    def __init__(self):
+        self.xtx = None
+        self.xty = None
+        self.yty = 0.0
+        self.n_samples_ = 0
+        self.feature_names_in_ = None
+        self.coef_ = None
+        self.intercept_ = None
+        self.coef_stderr_ = None
+        self.intercept_stderr_ = None
+        self.sigma2_ = None
+        self.rank_ = None
+
+    def fit(self, X, y):
+        """Fit on X and y from scratch."""
+        self.xtx = self.xty = None
+        self.yty = 0.0
+        self.n_samples_ = 0
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y):
+        """Add a batch of rows to the sufficient statistics and re-solve the coefficients."""
+        return self.update(X, y).solve()
+
+    def _check_features(self, names):
+        if self.feature_names_in_ is None:
+            self.feature_names_in_ = names
+        elif names is not None and list(names) != list(self.feature_names_in_):
+            raise ValueError("The columns of X differ from the columns the model was fitted on.")
+
+    def update(self, X, y):
+        """
+        Add a batch of rows to the sufficient statistics without solving.
+
+        Rows of a dense X or of y with missing values are skipped.
+        """
+        self._check_features(np.asarray(X.columns, dtype=object) if isinstance(X, pd.DataFrame) else None)
+        design = _design_matrix(X)
+        y = np.asarray(y, dtype=float)
+        if not sparse.issparse(design):
+            valid = ~(np.isnan(design).any(axis=1) | np.isnan(y))
+            if not valid.all():
+                design, y = design[valid], y[valid]
+
+        xtx = design.T @ design
+        xtx = xtx.toarray() if sparse.issparse(xtx) else xtx
+        xty = np.asarray(design.T @ y).ravel()
+        self._add(xtx, xty, float(y @ y), design.shape[0])
+        return self
+
+    def merge(self, other):
+        """Add the sufficient statistics of another SufficientStatsRegression, without solving."""
+        self._check_features(other.feature_names_in_)
+        if other.xtx is not None:
+            self._add(other.xtx, other.xty, other.yty, other.n_samples_)
+        return self
+
+    def _add(self, xtx, xty, yty, n_samples):
+        if self.xtx is None:
+            self.xtx, self.xty = xtx, xty
+        elif xtx.shape != self.xtx.shape:
+            raise ValueError("The number of features differs from the number the model was fitted on.")
+        else:
+            self.xtx = self.xtx + xtx
+            self.xty = self.xty + xty
+        self.yty += yty
+        self.n_samples_ += n_samples
+
+    def solve(self):
+        """Solve the normal equations for the coefficients and their standard errors."""
+        if self.xtx is None:
+            raise ValueError("No rows have been added. Call fit(), partial_fit() or update() first.")
+        # Solve with unit-diagonal (Jacobi) scaling so features of very different scales stay well-conditioned
+        diagonal = np.diag(self.xtx)
+        scale = 1 / np.sqrt(np.where(diagonal > 0, diagonal, 1.0))
+        scaled = self.xtx * np.outer(scale, scale)
+        beta_scaled, _, self.rank_, _ = np.linalg.lstsq(scaled, self.xty * scale, rcond=None)
+        beta = beta_scaled * scale
+        self.intercept_ = beta[0]
+        self.coef_ = beta[1:]
+
+        # RSS = yᵀy - 2βᵀXᵀy + βᵀXᵀXβ, clipped at zero against rounding
+        rss = max(self.yty - 2 * beta @ self.xty + beta @ self.xtx @ beta, 0.0)
+        dof = self.n_samples_ - self.rank_
+        self.sigma2_ = rss / dof if dof > 0 else np.nan
+        stderr = np.sqrt(np.maximum(self.sigma2_ * np.diag(np.linalg.pinv(scaled, hermitian=True)) * scale ** 2, 0))
+        self.intercept_stderr_ = stderr[0]
+        self.coef_stderr_ = stderr[1:]
+        return self
+
+    def summary(self):
+        """Coefficients with their standard errors, t statistics and two-sided p-values."""
+        if self.coef_ is None:
+            raise ValueError("The model has not been fitted. Call fit() or solve() first.")
+        names = list(self.feature_names_in_) if self.feature_names_in_ is not None else [
+            f"x{i}" for i in range(len(self.coef_))]
+        coef = np.concatenate([[self.intercept_], self.coef_])
+        stderr = np.concatenate([[self.intercept_stderr_], self.coef_stderr_])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_values = coef / stderr
+        dof = max(self.n_samples_ - self.rank_, 1)
+        return pd.DataFrame({
+            'Coefficient': coef,
+            'Std. Error': stderr,
+            't': t_values,
+            'P>|t|': 2 * stats.t.sf(np.abs(t_values), dof),
+        }, index=['Intercept'] + names)
+
+    def predict(self, X):
+        """Predict targets for X."""
+        if self.coef_ is None:
+            raise ValueError("The model has not been fitted. Call fit() or partial_fit() first.")
+        return np.asarray(_design_matrix(X) @ np.concatenate([[self.intercept_], self.coef_])).ravel()
+
+
+def _init_worker(options):
+    """Keep the streaming options in the worker process so they are sent only once per worker."""
+    global _worker_options
+    _worker_options = options
+
+
+def _accumulate(task):
+    """Accumulate the sufficient statistics of one file (or some of its Parquet row groups). Runs in a worker process."""
+    from ab_testing.streaming_tester import iter_chunks
+    from statical_modeling.modeling.model_builder import prepare_features
+
+    path, row_groups = task
+    target_column, feature_columns, preprocessor, chunksize = _worker_options
+    columns = None if preprocessor is not None or feature_columns is None else feature_columns + [target_column]
+    if row_groups is not None:
+        import pyarrow.parquet as pq
+
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(
+            batch_size=chunksize, columns=columns, row_groups=row_groups))
+    else:
+        chunks = iter_chunks(path, columns=columns, chunksize=chunksize)
+
+    model = SufficientStatsRegression()
+    # The preprocessing stages are returned so the parent process can record them
+    with instrumentation.collect() as records:
+        for chunk in chunks:
+            if preprocessor is not None:
+                chunk = preprocessor.transform(chunk)
+            X = chunk[feature_columns] if feature_columns is not None else chunk.drop(columns=[target_column])
+            model.update(prepare_features(X, 'Linear Regression'), chunk[target_column])
+    return model, records
+
+
+def _tasks(paths, n_jobs):
+    """One task per file; the row groups of a Parquet file are split across workers."""
+    tasks = []
+    for path in paths:
+        if n_jobs > 1 and os.path.splitext(path)[1] == '.parquet':
+            import pyarrow.parquet as pq
+
+            num_row_groups = pq.ParquetFile(path).num_row_groups
+            tasks.extend((path, list(range(i, num_row_groups, n_jobs)))
+                         for i in range(min(n_jobs, num_row_groups)))
+        else:
+            tasks.append((path, None))
+    return tasks
+
+
+def fit_streaming(paths, target_column, feature_columns=None, preprocessor=None, chunksize=250_000, n_jobs=1):
+    """
+    Fit a SufficientStatsRegression on CSV or Parquet files streamed in chunks.
+
+    Each worker process accumulates XᵀX, Xᵀy and yᵀy over its files (or Parquet row groups);
+    the statistics are merged and the normal equations are solved once. Only one chunk per
+    worker is held in memory.
+
+    :param paths: Path or list of paths, e.g. one file per year.
+    :param feature_columns: Feature columns (all columns except the target if None).
+    :param preprocessor: Optional fitted DataPreprocessor applied to every raw chunk.
+    """
+    paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+    options = (target_column, list(feature_columns) if feature_columns is not None else None, preprocessor, chunksize)
+    tasks = _tasks(paths, n_jobs)
+    if n_jobs == 1 or len(tasks) <= 1:
+        _init_worker(options)
+        results = [_accumulate(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(options,)) as executor:
+            results = list(executor.map(_accumulate, tasks))
+
+    model = SufficientStatsRegression()
+    for part, records in results:
+        model.merge(part)
+        instrumentation.add(records)
+    return model.solve()
@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import time
+import uuid
+import joblib
+import pandas as pd
+from utils.fingerprint import frame_fingerprint, object_fingerprint
+
+
+def artifact_key(*parts):
+    """
+    Hash the inputs an artifact was built from into a registry key.
+
+    DataFrames, Series and arrays are hashed by value (frame_fingerprint); anything else, such
+    as feature lists and hyperparameter dicts, by its pickled form.
+    """
+    hashes = [frame_fingerprint(part) if isinstance(part, (pd.DataFrame, pd.Series)) or hasattr(part, 'dtype')
+              else object_fingerprint(part) for part in parts]
+    return object_fingerprint(hashes)
+
+
+class ArtifactRegistry:
+    """
+    On-disk store of trained models, preprocessing state and evaluation results.
+
+    Each artifact lives in its own directory named by its key, with the pickled artifact and a
+    small metadata file. Artifacts are written to a temporary directory and renamed into place,
+    so several processes can use the same registry. NumPy arrays inside artifacts are
+    memory-mapped on load. When the registry grows beyond `max_size_mb` or `max_entries`, the
+    least recently used artifacts are evicted.
+    """
+
+    def __init__(self, root, max_size_mb=None, max_entries=None):
+        self.root = root
+        self.max_size_mb = max_size_mb
+        self.max_entries = max_entries
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, key):
+        return os.path.join(self.root, key)
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self._dir(key), 'metadata.json'))
+
+    def put(self, key, artifact, kind='artifact', metadata=None):
+        """Store an artifact under a key (replacing any earlier one) and evict old artifacts if needed."""
+        tmp_dir = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        joblib.dump(artifact, os.path.join(tmp_dir, 'artifact.joblib'))
+        info = {
+            'key': key,
+            'kind': kind,
+            'created': time.time(),
+            'size_mb': os.path.getsize(os.path.join(tmp_dir, 'artifact.joblib')) / 1024 ** 2,
+            'metadata': metadata or {},
+        }
+        with open(os.path.join(tmp_dir, 'metadata.json'), 'w') as f:
+            json.dump(info, f, default=str)
+
+        if key in self:
+            shutil.rmtree(self._dir(key), ignore_errors=True)
+        try:
+            os.replace(tmp_dir, self._dir(key))
+        except OSError:
+            # Another process stored the same artifact first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+        return key
+
+    def get(self, key, mmap=True):
+        """Load an artifact (None if it is not stored), memory-mapping its arrays unless mmap is False."""
+        path = os.path.join(self._dir(key), 'artifact.joblib')
+        try:
+            artifact = joblib.load(path, mmap_mode='r' if mmap else None)
+            os.utime(os.path.join(self._dir(key), 'metadata.json'))  # Last access time for LRU eviction
+        except FileNotFoundError:
+            # Not stored, or evicted by another process while it was being loaded
+            return None
+        return artifact
+
+    def get_or_create(self, key, factory, kind='artifact', metadata=None, mmap=True):
+        """Return the stored artifact, or build it with factory() and store it."""
+        artifact = self.get(key, mmap=mmap)
+        if artifact is None:
+            artifact = factory()
+            self.put(key, artifact, kind=kind, metadata=metadata)
+        return artifact
+
+    def entries(self):
+        """Table of the stored artifacts (key, kind, size, creation and last access time), most recent first."""
+        records = []
+        for key in os.listdir(self.root):
+            metadata_path = os.path.join(self._dir(key), 'metadata.json')
+            if key.startswith('.tmp-') or not os.path.exists(metadata_path):
+                continue
+            with open(metadata_path) as f:
+                info = json.load(f)
+            info['last_access'] = os.path.getmtime(metadata_path)
+            records.append(info)
+        columns = ['key', 'kind', 'size_mb', 'created', 'last_access', 'metadata']
+        return pd.DataFrame(records, columns=columns).sort_values('last_access', ascending=False, ignore_index=True)
+
+    def delete(self, key):
+        """Remove an artifact."""
+        shutil.rmtree(self._dir(key), ignore_errors=True)
+
+    def evict(self):
+        """Remove the least recently used artifacts until the size and entry limits are met."""
+        if self.max_size_mb is None and self.max_entries is None:
+            return []
+        entries = self.entries()
+        evicted = []
+        while len(entries) > 1 and (
+                (self.max_entries is not None and len(entries) > self.max_entries)
+                or (self.max_size_mb is not None and entries['size_mb'].sum() > self.max_size_mb)):
+            key = entries['key'].iloc[-1]
+            self.delete(key)
+            evicted.append(key)
+            entries = entries.iloc[:-1]
+        return evicted
@@ -0,0 +1,220 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from statical_modeling.data_preparation.data_preprocessor import DataPreprocessor
+from statical_modeling.modeling.model_builder import ModelBuilder, prepare_features
+
+
+class _Request:
+    """Policy records of one caller, waiting for their predictions."""
+
+    def __init__(self, records):
+        self.records = records
+        self.start = time.perf_counter()
+        self.done = threading.Event()
+        self.predictions = None
+        self.error = None
+
+
+class ScoringService:
+    """
+    Scores policy records with a fitted DataPreprocessor and a trained model, loaded once.
+
+    Requests from concurrent callers are queued and grouped into micro-batches of up to
+    `max_batch_size` records (waiting at most `max_wait_ms` for a batch to fill), which are
+    preprocessed and predicted in one vectorized call. Request latencies and throughput are
+    recorded for stats().
+    """
+
+    def __init__(self, preprocessor, model, model_name, max_batch_size=256, max_wait_ms=2.0,
+                 latency_window=10000):
+        """
+        :param preprocessor: Fitted DataPreprocessor (e.g. DataPreprocessor.load(path)).
+        :param model: Trained model, e.g. from ModelBuilder.load_model(path).
+        :param model_name: Name of the model in ModelBuilder ('XGBoost', 'Random Forest', ...).
+        :param latency_window: Number of most recent requests the latency percentiles cover.
+        """
+        if preprocessor.state is None:
+            raise ValueError("DataPreprocessor has not been fitted. Call fit() or load() first.")
+        self.preprocessor = preprocessor
+        self.model = model
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # Features the model was trained on (the fitted columns may include the target)
+        features = getattr(model, 'feature_names_in_', None)
+        self.features = list(features) if features is not None else None
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.records = 0
+        self.batches = 0
+        self.started = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def from_files(cls, preprocessor_path, model_path, **kwargs):
+        """Load a DataPreprocessor state saved with save() and a model saved with ModelBuilder.save_model()."""
+        model_name, model = ModelBuilder.load_model(model_path)
+        return cls(DataPreprocessor.load(preprocessor_path), model, model_name, **kwargs)
+
+    def predict_frame(self, data):
+        """Preprocess a DataFrame of raw policy records and predict them in one call."""
+        X = self.preprocessor.transform(data)
+        if self.features is not None:
+            X = X.reindex(columns=self.features, fill_value=0)
+        return np.asarray(self.model.predict(prepare_features(X, self.model_name)), dtype=float)
+
+    def start(self):
+        """Start the batching thread."""
+        if self._thread is None:
+            self.started = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name='scoring-batcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the batching thread after the queued requests are scored."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def predict(self, records, timeout=None):
+        """
+        Predict one record (a dict) or a list of records through the micro-batching queue.
+
+        Blocks until the predictions are ready and returns them as a list of floats.
+        """
+        if isinstance(records, dict):
+            records = [records]
+        if not records:
+            return []
+        self.start()
+        request = _Request(records)
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("The scoring request timed out.")
+        if request.error is not None:
+            raise request.error
+        return request.predictions
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch, size = [request], len(request.records)
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while size < self.max_batch_size:
+                try:
+                    request = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+                size += len(request.records)
+            self._score(batch)
+            if stop:
+                return
+
+    def _score(self, batch):
+        """Predict all records of a batch at once and hand every request its predictions."""
+        try:
+            predictions = self.predict_frame(pd.DataFrame([record for request in batch for record in request.records]))
+        except Exception as error:
+            if len(batch) > 1:
+                # Score the requests one by one so only the caller with invalid records gets the error
+                for request in batch:
+                    self._score([request])
+            else:
+                batch[0].error = error
+                batch[0].done.set()
+            return
+
+        end = time.perf_counter()
+        offset = 0
+        with self._lock:
+            for request in batch:
+                request.predictions = predictions[offset:offset + len(request.records)].tolist()
+                offset += len(request.records)
+                self.latencies.append(end - request.start)
+            self.requests += len(batch)
+            self.records += offset
+            self.batches += 1
+        for request in batch:
+            request.done.set()
+
+    def stats(self):
+        """Request counts, mean batch size, p50/p99 latency in ms and throughput in records per second."""
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            elapsed = time.perf_counter() - self.started if self.started else 0.0
+            return {
+                'requests': self.requests,
+                'records': self.records,
+                'batches': self.batches,
+                'mean_batch_size': self.records / self.batches if self.batches else 0.0,
+                'p50_latency_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                'p99_latency_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+                'throughput_per_s': self.records / elapsed if elapsed > 0 else 0.0,
+            }
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of the scoring server:
+
+    - POST /predict with a record, a list of records or {"records": [...]} returns {"predictions": [...]}
+    - GET /stats returns ScoringService.stats()
+    - GET /health returns {"status": "ok"}
+    """
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self._send(200, self.server.service.stats())
+        elif self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        else:
+            self._send(404, {'error': f"Unknown path '{self.path}'."})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._send(404, {'error': f"Unknown path '{self.path}'."})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            records = body['records'] if isinstance(body, dict) and 'records' in body else body
+            self._send(200, {'predictions': self.server.service.predict(records)})
+        except (ValueError, KeyError, TypeError) as error:
+            self._send(400, {'error': str(error)})
+        except Exception as error:  # Reply instead of dropping the connection
+            self._send(500, {'error': f"{type(error).__name__}: {error}"})
+
+    def log_message(self, format, *args):
+        """Do not log every request to stderr; use /stats for monitoring."""
+
+
+def make_server(service, host='127.0.0.1', port=8000):
+    """Create a threaded HTTP server for a ScoringService (port 0 picks a free port)."""
+    server = ThreadingHTTPServer((host, port), ScoringRequestHandler)
+    server.daemon_threads = True
+    server.service = service.start()
+    return server
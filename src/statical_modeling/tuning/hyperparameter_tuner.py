@@ -0,0 +1,254 @@
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold, ParameterSampler, train_test_split
+from statical_modeling.modeling.model_builder import prepare_features
+from utils.fingerprint import frame_fingerprint
+
+# Search spaces used when none is given: lists are sampled uniformly, scipy distributions via rvs()
+DEFAULT_PARAM_SPACES = {
+    'XGBoost': {
+        'max_depth': [3, 4, 6, 8, 10],
+        'learning_rate': [0.01, 0.03, 0.1, 0.3],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.5, 0.8, 1.0],
+        'min_child_weight': [1, 5, 20],
+        'reg_lambda': [0.1, 1.0, 10.0],
+    },
+    'Random Forest': {
+        'n_estimators': [100, 200, 400],
+        'max_depth': [None, 8, 16, 32],
+        'min_samples_leaf': [1, 5, 20],
+        'max_features': [1.0, 0.5, 'sqrt'],
+    },
+}
+
+RESULT_COLUMNS = ['trial', 'model', 'params', 'resource', 'settings', 'mean_mse', 'std_mse', 'best_iteration',
+                  'seconds']
+
+_worker_data = None
+
+
+def _init_worker(X, y, order):
+    """Keep the tuning data in the worker process so it is sent only once per worker."""
+    global _worker_data
+    _worker_data = (X, y, order)
+
+
+def _make_model(model_name, params, random_state, n_jobs):
+    """Create an unfitted model with the given hyperparameters."""
+    if model_name == 'XGBoost':
+        return xgb.XGBRegressor(**{'random_state': random_state, 'n_jobs': n_jobs, **params})
+    return RandomForestRegressor(**{'random_state': random_state, 'n_jobs': n_jobs, **params})
+
+
+def _evaluate_trial(model_name, params, resource, n_splits, random_state, early_stopping_rounds,
+                    max_estimators, validation_fraction, n_jobs):
+    """
+    Cross-validate one configuration on the first `resource` rows of the shuffled data.
+
+    For XGBoost a validation split of each training fold is used for early stopping, so the
+    held-out fold only ever serves for scoring. Runs inside a worker process.
+    """
+    X, y, order = _worker_data
+    start = time.perf_counter()
+    rows = order[:resource]
+    X_subset, y_subset = X.iloc[rows], y.iloc[rows]
+    has_categories = len(X.select_dtypes(include='category').columns) > 0
+
+    scores, iterations = [], []
+    for train_idx, test_idx in KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X_subset):
+        X_train, y_train = X_subset.iloc[train_idx], y_subset.iloc[train_idx]
+        X_test, y_test = X_subset.iloc[test_idx], y_subset.iloc[test_idx]
+
+        if model_name == 'XGBoost':
+            X_fit, X_val, y_fit, y_val = train_test_split(
+                X_train, y_train, test_size=validation_fraction, random_state=random_state)
+            model = _make_model(model_name, {'n_estimators': max_estimators,
+                                             'early_stopping_rounds': early_stopping_rounds,
+                                             'enable_categorical': has_categories, **params},
+                                random_state, n_jobs)
+            model.fit(prepare_features(X_fit, model_name), y_fit,
+                      eval_set=[(prepare_features(X_val, model_name), y_val)], verbose=False)
+            iterations.append(model.best_iteration)
+        else:
+            model = _make_model(model_name, params, random_state, n_jobs)
+            model.fit(prepare_features(X_train, model_name), y_train)
+
+        predictions = model.predict(prepare_features(X_test, model_name))
+        scores.append(mean_squared_error(y_test, predictions))
+
+    return {
+        'mean_mse': float(np.mean(scores)),
+        'std_mse': float(np.std(scores)),
+        'best_iteration': int(np.mean(iterations)) if iterations else None,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+class HyperparameterTuner:
+    """
+    Successive-halving / Hyperband search over k-fold cross-validation for XGBoost and Random Forest.
+
+    The resource allocated to a configuration is the number of training rows it is evaluated on.
+    Trials run in parallel worker processes and every finished trial is appended to a results
+    table which, when `results_path` is given, is saved to disk and reused on the next run.
+    """
+
+    def __init__(self, X, y, model_name='XGBoost', param_space=None, n_splits=3, eta=3,
+                 min_resource=None, max_resource=None, early_stopping_rounds=20, max_estimators=1000,
+                 validation_fraction=0.1, n_jobs=None, threads_per_trial=1, results_path=None,
+                 time_budget=None, random_state=42):
+        if model_name not in DEFAULT_PARAM_SPACES:
+            raise ValueError(f"Unknown model '{model_name}'. Expected one of {list(DEFAULT_PARAM_SPACES)}.")
+        self.X = X
+        self.y = y
+        self.model_name = model_name
+        self.param_space = param_space or DEFAULT_PARAM_SPACES[model_name]
+        self.n_splits = n_splits
+        self.eta = eta
+        self.max_resource = min(max_resource or len(X), len(X))
+        self.min_resource = min(min_resource or max(n_splits * 100, self.max_resource // eta ** 3), self.max_resource)
+        self.early_stopping_rounds = early_stopping_rounds
+        self.max_estimators = max_estimators
+        self.validation_fraction = validation_fraction
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.threads_per_trial = threads_per_trial
+        self.results_path = results_path
+        self.time_budget = time_budget
+        self.random_state = random_state
+        self._data_fingerprint = [frame_fingerprint(X), frame_fingerprint(y)]
+        self.results = self._load_results()
+        self.best_params_ = None
+        self.best_score_ = None
+        self._deadline = None
+
+    def _load_results(self):
+        """Load the results table of an earlier run, if any."""
+        if self.results_path and os.path.exists(self.results_path):
+            return pd.read_csv(self.results_path).reindex(columns=RESULT_COLUMNS)
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    def _settings(self):
+        """The data and evaluation settings a trial's score depends on besides its parameters and resource."""
+        return json.dumps({
+            'data': self._data_fingerprint,
+            'n_splits': self.n_splits,
+            'random_state': self.random_state,
+            'early_stopping_rounds': self.early_stopping_rounds,
+            'max_estimators': self.max_estimators,
+            'validation_fraction': self.validation_fraction,
+        }, sort_keys=True)
+
+    def _trial_key(self, params, resource):
+        return f"{self.model_name}|{json.dumps(params, sort_keys=True, default=str)}|{resource}|{self._settings()}"
+
+    def _in_param_space(self, params):
+        """Whether stored parameters could have been sampled from the current param_space."""
+        if set(params) != set(self.param_space):
+            return False
+        return all(hasattr(values, 'rvs') or params[name] in values for name, values in self.param_space.items())
+
+    def _sample_candidates(self, n_candidates, seed):
+        candidates = ParameterSampler(self.param_space, n_iter=n_candidates, random_state=seed)
+        # Use plain Python values so that parameters round-trip through the JSON results table
+        return [{name: value.item() if isinstance(value, np.generic) else value for name, value in params.items()}
+                for params in candidates]
+
+    def _out_of_time(self):
+        return self._deadline is not None and time.perf_counter() > self._deadline
+
+    def _evaluate(self, executor, candidates, resource):
+        """Evaluate the candidates at a resource level, reusing trials already in the results table."""
+        done = {row['trial']: row['mean_mse'] for _, row in self.results.iterrows()}
+        scores = {}
+        futures = {}
+        for i, params in enumerate(candidates):
+            key = self._trial_key(params, resource)
+            if key in done:
+                scores[i] = done[key]
+            else:
+                future = executor.submit(
+                    _evaluate_trial, self.model_name, params, resource, self.n_splits, self.random_state,
+                    self.early_stopping_rounds, self.max_estimators, self.validation_fraction,
+                    self.threads_per_trial)
+                futures[future] = (i, key, params)
+
+        for future in as_completed(futures):
+            i, key, params = futures[future]
+            trial = future.result()
+            scores[i] = trial['mean_mse']
+            row = {'trial': key, 'model': self.model_name, 'params': json.dumps(params, sort_keys=True, default=str),
+                   'resource': resource, 'settings': self._settings(), **trial}
+            new_row = pd.DataFrame([row], columns=RESULT_COLUMNS)
+            self.results = new_row if self.results.empty else pd.concat([self.results, new_row], ignore_index=True)
+            if self.results_path:
+                self.results.to_csv(self.results_path, index=False)
+        return [scores[i] for i in range(len(candidates))]
+
+    def _successive_halving(self, executor, candidates, resource):
+        """Evaluate the candidates, keep the best 1/eta and repeat with eta times more rows."""
+        while candidates and not self._out_of_time():
+            scores = self._evaluate(executor, candidates, resource)
+            ranked = [candidates[i] for i in np.argsort(scores)]
+            if len(ranked) == 1 or resource >= self.max_resource:
+                return
+            candidates = ranked[:max(1, len(ranked) // self.eta)]
+            resource = min(resource * self.eta, self.max_resource)
+
+    def search(self, method='hyperband', n_candidates=27):
+        """
+        Run the search and return the best parameters found at the largest evaluated resource.
+
+        :param method: 'halving' for a single successive-halving run over `n_candidates`
+                       configurations, or 'hyperband' for all Hyperband brackets.
+        :param n_candidates: Number of configurations for the 'halving' method.
+        """
+        if method not in ('halving', 'hyperband'):
+            raise ValueError(f"Unknown search method '{method}'. Expected 'halving' or 'hyperband'.")
+
+        self._deadline = time.perf_counter() + self.time_budget if self.time_budget else None
+        order = np.random.default_rng(self.random_state).permutation(len(self.X))
+        max_workers = max(1, self.n_jobs // self.threads_per_trial)
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(self.X, self.y, order)) as executor:
+            if method == 'halving':
+                self._successive_halving(executor, self._sample_candidates(n_candidates, self.random_state),
+                                         self.min_resource)
+            else:
+                s_max = int(math.log(self.max_resource / self.min_resource, self.eta) + 1e-9)
+                for s in range(s_max, -1, -1):
+                    if self._out_of_time():
+                        break
+                    n = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+                    resource = max(self.min_resource, int(self.max_resource / self.eta ** s))
+                    self._successive_halving(executor, self._sample_candidates(n, self.random_state + s), resource)
+
+        return self._select_best()
+
+    def _select_best(self):
+        """
+        Pick the configuration with the lowest mean MSE at the largest evaluated resource, among the
+        stored trials of this model with the current data, evaluation settings and parameter space.
+        """
+        results = self.results[(self.results['model'] == self.model_name)
+                               & (self.results['settings'] == self._settings())]
+        results = results[[self._in_param_space(json.loads(params)) for params in results['params']]]
+        if results.empty:
+            return None
+        top = results[results['resource'] == results['resource'].max()]
+        best = top.loc[top['mean_mse'].idxmin()]
+        self.best_params_ = json.loads(best['params'])
+        if self.model_name == 'XGBoost' and not pd.isna(best['best_iteration']):
+            # Refit with the number of boosting rounds found by early stopping
+            self.best_params_['n_estimators'] = int(best['best_iteration']) + 1
+        self.best_score_ = float(best['mean_mse'])
+        return self.best_params_
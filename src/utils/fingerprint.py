@@ -0,0 +1,26 @@
+import hashlib
+import pickle
+import numpy as np
+import pandas as pd
+
+
+def frame_fingerprint(data):
+    """Return an MD5 fingerprint of a DataFrame's values, index and columns (or of a NumPy array)."""
+    digest = hashlib.md5()
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        columns = data.columns if isinstance(data, pd.DataFrame) else [data.name]
+        digest.update(repr([(str(col), str(dtype)) for col, dtype in zip(columns, np.atleast_1d(data.dtypes))]).encode())
+    else:
+        array = np.ascontiguousarray(data)
+        digest.update(array.tobytes())
+        digest.update(repr((array.shape, str(array.dtype))).encode())
+    return digest.hexdigest()
+
+
+def object_fingerprint(obj):
+    """Return an MD5 fingerprint of any picklable object, e.g. a fitted model or a parameter dict."""
+    if hasattr(obj, 'get_booster'):
+        # XGBoost models: hash the serialised booster rather than the Python wrapper
+        return hashlib.md5(bytes(obj.get_booster().save_raw())).hexdigest()
+    return hashlib.md5(pickle.dumps(obj, protocol=4)).hexdigest()
@@ -0,0 +1,266 @@
+import cProfile
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+import pandas as pd
+
+try:
+    import resource  # Peak memory measurement, not available on Windows
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb():
+    """Return the peak resident memory of the current process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, kilobytes on Linux
+
+
+def _count_rows(value):
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+
+class Instrumentation:
+    """
+    Records the wall time, CPU time, peak memory and rows processed of pipeline stages.
+
+    Every stage produces one record, which is kept in memory (see records() and summary()),
+    logged as a JSON line on the 'utils.instrumentation' logger at INFO level and, with a
+    `metrics_file`, appended to that file as a JSON line. Stages can be nested; each record
+    names its parent stage. Peak memory is the process' peak RSS; with `trace_allocations`
+    the peak of Python allocations during the stage is measured with tracemalloc as well, at
+    a noticeable cost. With a `profile_dir` the outermost stages are run under cProfile and
+    the statistics are dumped to a .prof file per stage (view with pstats or snakeviz).
+
+    Stages run in a worker process are recorded in that process only. To see them in the
+    parent, the worker runs its stages inside collect() and returns the records, and the
+    parent passes them to add(); ModelBuilder.train_models and fit_streaming do this.
+    """
+
+    def __init__(self, metrics_file=None, profile_dir=None, profile_stages=None, trace_allocations=False,
+                 enabled=True, max_records=10000):
+        """
+        :param profile_stages: Names of the stages to profile (all outermost stages if None).
+        :param max_records: Number of most recent records kept in memory.
+        """
+        self._started_tracing = False
+        self.configure(metrics_file, profile_dir, profile_stages, trace_allocations, enabled)
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = 0
+
+    def configure(self, metrics_file=None, profile_dir=None, profile_stages=None, trace_allocations=False,
+                  enabled=True):
+        """Change where records go and what is measured, e.g. from a script's command line options."""
+        self.metrics_file = metrics_file
+        self.profile_dir = profile_dir
+        self.profile_stages = set(profile_stages) if profile_stages is not None else None
+        self.trace_allocations = trace_allocations
+        self.enabled = enabled
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        elif not trace_allocations and self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return self
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _start_profile(self, name, stack):
+        if self.profile_dir is None or any(frame['profiler'] is not None for frame in stack):
+            return None
+        if self.profile_stages is not None and name not in self.profile_stages:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Another profiler is already active (Python 3.12+)
+            return None
+        return profiler
+
+    def _dump_profile(self, name, profiler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        with self._lock:
+            self._profiles += 1
+            number = self._profiles
+        path = os.path.join(self.profile_dir, f"{name.replace('/', '_')}_{os.getpid()}_{number}.prof")
+        profiler.dump_stats(path)
+        return path
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Measure the code of a `with` block as a stage.
+
+        Yields the stage's record; set record['rows'] inside the block when the number of
+        processed rows is only known there.
+        """
+        if not self.enabled:
+            yield {'stage': name, 'rows': rows}
+            return
+
+        stack = self._stack()
+        tracing = self.trace_allocations and tracemalloc.is_tracing()
+        if tracing:
+            if stack:
+                stack[-1]['alloc_peak'] = max(stack[-1]['alloc_peak'], tracemalloc.get_traced_memory()[1])
+            alloc_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        frame = {'name': name, 'profiler': self._start_profile(name, stack), 'alloc_peak': 0}
+        record = {'stage': name, 'parent': stack[-1]['name'] if stack else None, 'rows': rows}
+        stack.append(frame)
+
+        rss_start = peak_rss_mb()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        status = 'ok'
+        try:
+            yield record
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            wall_time = time.perf_counter() - wall_start
+            cpu_time = time.process_time() - cpu_start
+            stack.pop()
+            if frame['profiler'] is not None:
+                frame['profiler'].disable()
+                record['profile'] = self._dump_profile(name, frame['profiler'])
+            peak_alloc = None
+            if tracing:
+                alloc_peak = max(frame['alloc_peak'], tracemalloc.get_traced_memory()[1])
+                peak_alloc = (alloc_peak - alloc_start) / 1024 ** 2
+                if stack:
+                    stack[-1]['alloc_peak'] = max(stack[-1]['alloc_peak'], alloc_peak)
+            rss_end = peak_rss_mb()
+            record.update({
+                'status': status,
+                'timestamp': time.time(),
+                'pid': os.getpid(),
+                'wall_time_s': wall_time,
+                'cpu_time_s': cpu_time,
+                'peak_rss_mb': rss_end,
+                'rss_growth_mb': rss_end - rss_start if rss_end is not None else None,
+                'peak_alloc_mb': peak_alloc,
+                'rows_per_s': record['rows'] / wall_time if record['rows'] and wall_time > 0 else None,
+            })
+            self._emit(record)
+
+    @contextmanager
+    def collect(self):
+        """
+        Collect the records of the stages run inside the block instead of emitting them, e.g. in a
+        worker process so that the parent process can emit them with add().
+        """
+        previous = getattr(self._local, 'collected', None)
+        self._local.collected = []
+        try:
+            yield self._local.collected
+        finally:
+            self._local.collected = previous
+
+    def add(self, records):
+        """Emit records collected in another process. Outermost stages get the current stage as parent."""
+        stack = self._stack()
+        for record in records:
+            if record['parent'] is None and stack:
+                record = {**record, 'parent': stack[-1]['name']}
+            self._emit(record)
+
+    def _emit(self, record):
+        collected = getattr(self._local, 'collected', None)
+        if collected is not None:
+            collected.append(record)
+            return
+        log = logger.isEnabledFor(logging.INFO)
+        line = json.dumps(record, default=str) if log or self.metrics_file is not None else None
+        with self._lock:
+            self._records.append(record)
+            if self.metrics_file is not None:
+                with open(self.metrics_file, 'a') as file:
+                    file.write(line + '\n')
+        if log:
+            logger.info(line)
+
+    def instrumented(self, name=None, rows=None):
+        """
+        Decorator that measures every call of a function or method as a stage.
+
+        :param name: Stage name (the function's qualified name, e.g. 'DataPreprocessor.preprocess', if None).
+        :param rows: How to count the processed rows: the name of an attribute of the instance
+                     (e.g. 'data'), or a function of the return value. By default the rows of a
+                     returned DataFrame, or else of the instance's `data` or `df` DataFrame, are counted.
+        """
+        def decorator(function):
+            stage_name = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.stage(stage_name) as record:
+                    result = function(*args, **kwargs)
+                    record['rows'] = self._rows(rows, args, result)
+                return result
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _rows(rows, args, result):
+        if callable(rows):
+            return rows(result)
+        instance = args[0] if args else None
+        if isinstance(rows, str):
+            return _count_rows(getattr(instance, rows, None))
+        count = _count_rows(result)
+        for attribute in ('data', 'df'):
+            if count is None:
+                count = _count_rows(getattr(instance, attribute, None))
+        return count
+
+    def records(self):
+        """The recorded stages, oldest first."""
+        with self._lock:
+            return list(self._records)
+
+    def summary(self):
+        """Calls, total and mean wall time, total CPU time, peak memory and rows per stage, slowest first."""
+        records = pd.DataFrame(self.records(), columns=['stage', 'wall_time_s', 'cpu_time_s', 'peak_rss_mb',
+                                                        'peak_alloc_mb', 'rows'])
+        summary = records.groupby('stage').agg(
+            calls=('wall_time_s', 'size'),
+            total_wall_time_s=('wall_time_s', 'sum'),
+            mean_wall_time_s=('wall_time_s', 'mean'),
+            total_cpu_time_s=('cpu_time_s', 'sum'),
+            peak_rss_mb=('peak_rss_mb', 'max'),
+            peak_alloc_mb=('peak_alloc_mb', 'max'),
+            rows=('rows', 'sum'),
+        )
+        return summary.sort_values('total_wall_time_s', ascending=False)
+
+    def reset(self):
+        """Forget the recorded stages."""
+        with self._lock:
+            self._records.clear()
+
+
+# Process-wide instrumentation used by the pipeline stages
+instrumentation = Instrumentation()
+configure = instrumentation.configure
+stage = instrumentation.stage
+instrumented = instrumentation.instrumented
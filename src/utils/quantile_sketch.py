@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    """
+    Mergeable KLL-style quantile sketch of a numeric stream.
+
+    Values are kept in levels of compactors; an item at level h stands for 2**h values. When a
+    level holds more than `k` items it is sorted and every other item (from a random offset) is
+    promoted to the next level. Memory stays O(k log(n / k)) and the rank error is about
+    log2(n / k) / k. Count, min and max are exact, and sketches of separate chunks, files or
+    processes can be merged.
+    """
+
+    def __init__(self, k=2000, random_state=42):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.nan
+        self.max = np.nan
+        self._rng = np.random.default_rng(random_state)
+
+    def update(self, values):
+        """Add an array of values; missing values are ignored."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Merge another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self.k:
+                items = np.sort(items)
+                # An odd item out stays at this level so no weight is lost
+                keep = items[:len(items) % 2]
+                promoted = items[len(keep):][self._rng.integers(2)::2]
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def quantile(self, q):
+        """Approximate quantile(s) for q in [0, 1]; exact at 0 and 1."""
+        q = np.asarray(q, dtype=float)
+        if self.count == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cumulative = items[order], np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        result = items[np.minimum(index, len(items) - 1)]
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result if q.ndim else float(result)
+
+    def __len__(self):
+        return self.count
+
+
+class SegmentedQuantileSketch:
+    """
+    QuantileSketches of several columns, optionally one per segment of a grouping column.
+
+    Built chunk by chunk (or per process) and merged, so quantile-based bounds such as
+    percentile caps and IQR fences can be computed for data that is streamed, and for every
+    segment (e.g. Province) in the same pass instead of re-sorting each segment.
+    """
+
+    def __init__(self, columns, by=None, k=2000, random_state=42):
+        self.columns = list(columns)
+        self.by = by
+        self.k = k
+        self.random_state = random_state
+        self.sketches = {}  # (segment, column) -> QuantileSketch; the segment is None without `by`
+
+    def _sketch(self, segment, column):
+        key = (segment, column)
+        if key not in self.sketches:
+            self.sketches[key] = QuantileSketch(self.k, self.random_state + len(self.sketches))
+        return self.sketches[key]
+
+    def update(self, chunk):
+        """Add one chunk of rows. Rows with a missing segment are ignored."""
+        values = chunk[self.columns].to_numpy(dtype=float)
+        if self.by is None:
+            groups = {None: slice(None)}
+        else:
+            groups = chunk.groupby(self.by, observed=True, sort=False).indices
+        for segment, rows in groups.items():
+            for i, column in enumerate(self.columns):
+                self._sketch(segment, column).update(values[rows, i])
+        return self
+
+    def consume(self, path, chunksize=250_000):
+        """Build the sketches from a CSV or Parquet file, streamed in chunks."""
+        from ab_testing.streaming_tester import iter_chunks
+
+        columns = self.columns + ([self.by] if self.by is not None else [])
+        for chunk in iter_chunks(path, columns=columns, chunksize=chunksize):
+            self.update(chunk)
+        return self
+
+    def merge(self, other):
+        """Merge another SegmentedQuantileSketch, e.g. one built on another chunk or file, into this one."""
+        for (segment, column), sketch in other.sketches.items():
+            self._sketch(segment, column).merge(sketch)
+        return self
+
+    def quantile(self, q):
+        """
+        Approximate q-quantile of every column: a Series indexed by column, or with `by` a
+        DataFrame indexed by segment with one column per sketched column.
+        """
+        values = {key: sketch.quantile(q) for key, sketch in self.sketches.items()}
+        if self.by is None:
+            return pd.Series([values.get((None, column), np.nan) for column in self.columns],
+                             index=self.columns, dtype=float)
+        table = pd.Series(values, dtype=float).unstack()
+        table.index.name = self.by
+        return table.reindex(columns=self.columns)
+
+    def iqr_bounds(self, factor=1.5):
+        """Lower and upper IQR fences (Q1 - factor * IQR, Q3 + factor * IQR) per column (and segment)."""
+        q1, q3 = self.quantile(0.25), self.quantile(0.75)
+        iqr = q3 - q1
+        return q1 - factor * iqr, q3 + factor * iqr
@@ -1,11 +1,16 @@
 import sys
 import unittest
 import pandas as pd
-from scipy.stats import ttest_ind
+import numpy as np
+from scipy.stats import chi2_contingency, ttest_ind
+import tempfile
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
 from ab_testing.data_processor import DataProcessor, HypothesisTester
+from ab_testing.segment_tester import SegmentTester, adjust_p_values
+from ab_testing.streaming_tester import StreamingHypothesisTester
+from ab_testing.resampling_tester import ResamplingTester
 
 class TestDataProcessor(unittest.TestCase):
 
@@ -80,5 +85,150 @@ class TestHypothesisTester(unittest.TestCase):
         self.assertEqual(self.hypothesis_tester.results[0]['Hypothesis'], 'Test Hypothesis')
 
 
+class TestSegmentTester(unittest.TestCase):
+
+    def setUp(self):
+        """Set up data with several postal codes."""
+        rng = np.random.default_rng(0)
+        self.data = pd.DataFrame({
+            'PostalCode': rng.choice([1000, 2000, 3000, 4000], 400),
+            'TotalClaims': rng.exponential(1000, 400),
+        })
+        self.segment_tester = SegmentTester(self.data)
+
+    def test_pairwise_tests_match_ttest_ind(self):
+        """Test that every pairwise Welch test matches scipy's ttest_ind."""
+        report = self.segment_tester.pairwise_tests('PostalCode', 'TotalClaims', correction=None)
+        self.assertEqual(len(report), 6)
+        for _, row in report.iterrows():
+            a = self.data.loc[self.data['PostalCode'] == row['group_a'], 'TotalClaims']
+            b = self.data.loc[self.data['PostalCode'] == row['group_b'], 'TotalClaims']
+            stat, expected_p_value = ttest_ind(a, b, equal_var=False)
+            self.assertAlmostEqual(row['t_stat'], stat)
+            self.assertAlmostEqual(row['p_value'], expected_p_value)
+
+    def test_one_vs_rest_tests(self):
+        """Test one group against the rest of the rows."""
+        report = self.segment_tester.one_vs_rest_tests('PostalCode', 'TotalClaims', correction='bonferroni')
+        row = report[report['group_a'] == 1000].iloc[0]
+        stat, expected_p_value = ttest_ind(
+            self.data.loc[self.data['PostalCode'] == 1000, 'TotalClaims'],
+            self.data.loc[self.data['PostalCode'] != 1000, 'TotalClaims'], equal_var=False)
+        self.assertAlmostEqual(row['p_value'], expected_p_value)
+        self.assertAlmostEqual(row['p_adjusted'], min(1.0, expected_p_value * 4))
+
+    def test_adjust_p_values(self):
+        """Test the Benjamini-Hochberg and Bonferroni corrections."""
+        p_values = [0.01, 0.04, 0.03, 0.005]
+        np.testing.assert_allclose(adjust_p_values(p_values, 'fdr_bh'), [0.02, 0.04, 0.04, 0.02])
+        np.testing.assert_allclose(adjust_p_values(p_values, 'bonferroni'), [0.04, 0.16, 0.12, 0.02])
+
+
+class TestStreamingHypothesisTester(unittest.TestCase):
+
+    def setUp(self):
+        """Write data with provinces and zero-inflated claims to a CSV file."""
+        rng = np.random.default_rng(1)
+        self.data = pd.DataFrame({
+            'Province': rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], 500),
+            'TotalClaims': np.where(rng.random(500) < 0.7, 0.0, rng.exponential(2000, 500)),
+        })
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'data.csv')
+        self.data.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_streamed_p_values_match_in_memory_tests(self):
+        """Test that chunked accumulation gives the p-values of ttest_ind and chi2_contingency."""
+        tester = StreamingHypothesisTester('Province', outcome=lambda chunk: chunk['TotalClaims'] > 0)
+        tester.consume(self.path, chunksize=37)
+        self.assertEqual(tester.rows, 500)
+
+        gauteng = self.data[self.data['Province'] == 'Gauteng']['TotalClaims']
+        western_cape = self.data[self.data['Province'] == 'Western Cape']['TotalClaims']
+        stat, expected_p_value = ttest_ind(gauteng, western_cape, equal_var=False)
+        self.assertAlmostEqual(tester.t_test('Gauteng', 'Western Cape'), expected_p_value)
+
+        table = pd.crosstab(self.data['Province'], self.data['TotalClaims'] > 0)
+        chi2, expected_chi2_p_value, _, _ = chi2_contingency(table)
+        self.assertAlmostEqual(tester.chi_squared_test(), expected_chi2_p_value)
+
+    def test_incremental_refresh(self):
+        """Test that a saved state updated with new rows equals a state built from all rows."""
+        tester = StreamingHypothesisTester('Province')
+        tester.update(self.data.iloc[:300])
+        path = os.path.join(self.tmp_dir.name, 'state.joblib')
+        tester.save(path)
+
+        refreshed = StreamingHypothesisTester.load(path).update(self.data.iloc[300:])
+        full = StreamingHypothesisTester('Province').update(self.data)
+        pd.testing.assert_frame_equal(refreshed.summary(), full.summary(), check_exact=False)
+
+    def test_outcome_survives_save_and_load(self):
+        """Test that an outcome column is restored by load() and that a lost callable outcome raises."""
+        data = self.data.assign(HasClaim=self.data['TotalClaims'] > 0)
+        path = os.path.join(self.tmp_dir.name, 'state.joblib')
+        StreamingHypothesisTester('Province', outcome='HasClaim').update(data.iloc[:200]).save(path)
+
+        refreshed = StreamingHypothesisTester.load(path).update(data.iloc[200:])
+        self.assertEqual(refreshed.contingency.to_numpy().sum(), 500)
+        full = StreamingHypothesisTester('Province', outcome='HasClaim').update(data)
+        self.assertAlmostEqual(refreshed.chi_squared_test(), full.chi_squared_test())
+        with self.assertRaises(KeyError):
+            refreshed.update(self.data)
+
+        StreamingHypothesisTester('Province', outcome=lambda chunk: chunk['TotalClaims'] > 0).update(data).save(path)
+        with self.assertRaises(ValueError):
+            StreamingHypothesisTester.load(path).update(data)
+
+
+class TestResamplingTester(unittest.TestCase):
+
+    def setUp(self):
+        """Set up two groups with zero-inflated claims."""
+        rng = np.random.default_rng(2)
+        self.group_a = pd.DataFrame({
+            'TotalClaims': np.where(rng.random(200) < 0.8, 0.0, rng.exponential(3000, 200)),
+            'TotalPremium': rng.exponential(100, 200) + 1,
+        })
+        self.group_b = pd.DataFrame({
+            'TotalClaims': np.where(rng.random(150) < 0.8, 0.0, rng.exponential(3000, 150)) + 5000,
+            'TotalPremium': rng.exponential(100, 150) + 1,
+        })
+
+    def test_permutation_test_is_deterministic_across_workers(self):
+        """Test that results depend on the seed only, not on batching or the number of workers."""
+        serial = ResamplingTester(n_resamples=500, batch_size=100).permutation_test(self.group_a, self.group_b)
+        parallel = ResamplingTester(n_resamples=500, batch_size=100, n_jobs=2).permutation_test(
+            self.group_a, self.group_b)
+        self.assertEqual(serial, parallel)
+        self.assertLess(serial['p_value'], 0.01)
+        self.assertLess(serial['ci_low'], serial['difference'])
+        self.assertGreater(serial['ci_high'], serial['difference'])
+
+    def test_bootstrap_statistics(self):
+        """Test the bootstrap test for the median and the loss ratio."""
+        tester = ResamplingTester(n_resamples=300)
+        for statistic in ('median', 'loss_ratio'):
+            result = tester.bootstrap_test(self.group_a, self.group_b, statistic=statistic)
+            self.assertLessEqual(result['ci_low'], result['ci_high'])
+            self.assertLess(result['p_value'], 0.05)
+
+        with self.assertRaises(ValueError):
+            tester.bootstrap_test(self.group_a, self.group_b, statistic='mode')
+
+    def test_missing_values_are_dropped(self):
+        """Test that rows with a missing KPI are left out instead of turning the results into NaN."""
+        tester = ResamplingTester(n_resamples=300)
+        group_a = pd.concat([self.group_a, pd.DataFrame({'TotalClaims': [np.nan], 'TotalPremium': [50.0]})])
+        for test in (tester.permutation_test, tester.bootstrap_test):
+            self.assertEqual(test(group_a, self.group_b), test(self.group_a, self.group_b))
+
+        with self.assertRaises(ValueError):
+            tester.permutation_test(self.group_a.assign(TotalClaims=np.nan), self.group_b)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import pandas as pd
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../scripts')))
+from data_cleaner.data_cleaner import DataCleaner
+
+
+class TestDataCleaner(unittest.TestCase):
+
+    def setUp(self):
+        """Set up titles and genders covering every branch of the gender inference."""
+        self.df = pd.DataFrame({
+            'Title': ['Mr', 'Mrs', 'Miss', 'Ms', 'Dr', 'Dr', 'Prof', 'Mr', np.nan, np.nan, 'Mrs'],
+            'Gender': ['Not specified', np.nan, 'Not specified', 'Not specified', 'Not specified', 'Female',
+                       'Not specified', 'Female', 'Male', np.nan, 'Female'],
+            'TotalPremium': [100.0, 200.0, 50.0, 75.0, 80.0, 90.0, 60.0, 70.0, 30.0, 40.0, 20.0],
+            'TotalClaims': [0.0, 50.0, 0.0, 10.0, 0.0, 0.0, 5.0, 0.0, 0.0, 0.0, 0.0],
+        })
+
+    def rowwise(self, df):
+        cleaner = DataCleaner(df.copy())
+        cleaner.clean_gender_rowwise()
+        return cleaner.get_cleaned_data()['Gender']
+
+    def test_clean_gender_matches_rowwise(self):
+        """Test that the vectorized gender inference gives the row-wise result."""
+        cleaner = DataCleaner(self.df.copy())
+        self.assertEqual(cleaner.gender_mode, 'Female')
+        cleaner.clean_gender()
+        result = cleaner.get_cleaned_data()['Gender']
+        pd.testing.assert_series_equal(result, self.rowwise(self.df))
+        # 'Dr' takes the mode; an unmapped title or a missing title and gender stays missing
+        self.assertEqual(result[4], 0)
+        self.assertTrue(np.isnan(result[6]) and np.isnan(result[9]))
+
+    def test_clean_gender_without_missing_values(self):
+        """Test the int64 result when every gender is resolved."""
+        df = self.df.iloc[[0, 1, 2, 4, 5, 7, 8]]
+        cleaner = DataCleaner(df.copy())
+        cleaner.clean_gender()
+        result = cleaner.get_cleaned_data()['Gender']
+        self.assertEqual(result.dtype, np.int64)
+        pd.testing.assert_series_equal(result, self.rowwise(df).astype(np.int64))
+
+    def test_clean_gender_compact(self):
+        """Test the nullable Int8 encoding."""
+        cleaner = DataCleaner(self.df.copy())
+        cleaner.clean_gender(compact=True)
+        result = cleaner.get_cleaned_data()['Gender']
+        self.assertEqual(result.dtype, 'Int8')
+        pd.testing.assert_series_equal(result, self.rowwise(self.df).astype('Int8'))
+
+    def test_add_margin_column(self):
+        """Test the margin column and the error without premium and claims."""
+        cleaner = DataCleaner(self.df.copy())
+        cleaner.add_margin_column()
+        pd.testing.assert_series_equal(cleaner.get_cleaned_data()['Margin'],
+                                       self.df['TotalPremium'] - self.df['TotalClaims'], check_names=False)
+        with self.assertRaises(KeyError):
+            DataCleaner(self.df[['Title', 'Gender']].copy()).add_margin_column()
+
+
+if __name__ == '__main__':
+    unittest.main()
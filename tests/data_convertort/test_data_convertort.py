@@ -0,0 +1,121 @@
+import unittest
+import pandas as pd
+import numpy as np
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../scripts')))
+from data_convertort.convert_to_csv import TxtToCSVConverter, find_line_boundaries
+
+# Small chunks so the test file is split into many line-aligned chunks
+CHUNK_SIZE = 2048
+
+
+class TestTxtToCSVConverter(unittest.TestCase):
+
+    def setUp(self):
+        """Write a pipe-separated MachineLearningRating-like file."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_file = os.path.join(self.tmp_dir.name, 'data.txt')
+        self.write_lines(self.lines(0, 600))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    @staticmethod
+    def lines(start, stop):
+        rng = np.random.default_rng(start)
+        provinces = rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], stop - start)
+        return [f"{i}|2015-0{i % 9 + 1}-01 00:00:00|{province}|{rng.exponential(100):.4f}|{i % 7 * 10.5}\n"
+                for i, province in zip(range(start, stop), provinces)]
+
+    def write_lines(self, lines, mode='w'):
+        with open(self.input_file, mode) as f:
+            if mode == 'w':
+                f.write('PolicyID|TransactionMonth|Province|TotalPremium|TotalClaims\n')
+            f.writelines(lines)
+        # Make sure a change is seen even within the file system's mtime resolution
+        stat = os.stat(self.input_file)
+        os.utime(self.input_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def expected_csv(self):
+        """CSV output of the reference row-by-row conversion."""
+        output_file = self.path('expected.csv')
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        TxtToCSVConverter(self.input_file, output_file).convert()
+        with open(output_file, 'rb') as f:
+            return f.read()
+
+    def read(self, name):
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def test_convert_parallel_matches_convert(self):
+        """Test that the parallel conversion writes the same bytes as convert()."""
+        self.assertGreater(len(find_line_boundaries(self.input_file, CHUNK_SIZE)), 5)
+        result = TxtToCSVConverter(self.input_file, self.path('out.csv')).convert_parallel(
+            workers=2, chunk_size=CHUNK_SIZE)
+        self.assertEqual(result['rows'], 601)
+        self.assertEqual(self.read('out.csv'), self.expected_csv())
+
+    def test_convert_incremental_after_append_and_edit(self):
+        """Test the incremental conversion on a new file, an unchanged file, appended rows and an in-place edit."""
+        converter = TxtToCSVConverter(self.input_file, self.path('out.csv'))
+        first = converter.convert_incremental(workers=2, chunk_size=CHUNK_SIZE)
+        self.assertEqual(first['reused_chunks'], 0)
+        self.assertEqual(self.read('out.csv'), self.expected_csv())
+
+        # Unchanged input: the manifest is reused and nothing is converted
+        unchanged = converter.convert_incremental(workers=2, chunk_size=CHUNK_SIZE)
+        self.assertEqual(unchanged['converted_chunks'], 0)
+        self.assertEqual(unchanged['reused_chunks'], first['converted_chunks'])
+
+        # Appended rows: the leading chunks are reused and only the tail is converted
+        self.write_lines(self.lines(600, 700), mode='a')
+        appended = converter.convert_incremental(workers=2, chunk_size=CHUNK_SIZE)
+        self.assertGreater(appended['reused_chunks'], 0)
+        self.assertEqual(self.read('out.csv'), self.expected_csv())
+
+        # An edit in the middle that changes the line length re-converts that chunk and every later one
+        lines = self.lines(0, 600) + self.lines(600, 700)
+        lines[350] = lines[350].replace('00:00:00', '00:00:00.000')
+        self.write_lines(lines)
+        ranges = find_line_boundaries(self.input_file, CHUNK_SIZE)
+        with open(self.input_file, 'rb') as f:
+            edit_offset = f.read().index(lines[350].encode())
+        edited_chunk = next(i for i, (start, end) in enumerate(ranges) if start <= edit_offset < end)
+        self.assertTrue(0 < edited_chunk < len(ranges) - 1)
+        edited = converter.convert_incremental(workers=2, chunk_size=CHUNK_SIZE)
+        self.assertEqual(edited['reused_chunks'], edited_chunk)
+        self.assertEqual(edited['converted_chunks'], len(ranges) - edited_chunk)
+        self.assertEqual(self.read('out.csv'), self.expected_csv())
+
+        # Rows removed from the end: the output is truncated
+        self.write_lines(lines[:500])
+        converter.convert_incremental(workers=2, chunk_size=CHUNK_SIZE)
+        self.assertEqual(self.read('out.csv'), self.expected_csv())
+
+    def test_convert_to_parquet_matches_convert(self):
+        """Test that the Parquet output holds the same rows and values as the CSV of convert()."""
+        parquet_file = TxtToCSVConverter(self.input_file, self.path('out.csv')).convert_to_parquet(
+            row_group_size=100)
+        self.expected_csv()
+        expected = pd.read_csv(self.path('expected.csv'))
+        result = pd.read_parquet(parquet_file)
+
+        self.assertEqual(list(result.columns), list(expected.columns))
+        self.assertEqual(result['PolicyID'].dtype, np.int64)
+        self.assertIsInstance(result['Province'].dtype, pd.CategoricalDtype)
+        pd.testing.assert_series_equal(result['Province'].astype(object), expected['Province'])
+        np.testing.assert_array_equal(result['PolicyID'], expected['PolicyID'])
+        np.testing.assert_allclose(result['TotalPremium'], expected['TotalPremium'], rtol=1e-6)
+        self.assertTrue((result['TransactionMonth'] == pd.to_datetime(expected['TransactionMonth'])).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import pandas as pd
+import numpy as np
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from data_loader.data_loader import DataLoader
+from eda.eda import EDA
+
+class TestDataLoader(unittest.TestCase):
+
+    def setUp(self):
+        """Write a small MachineLearningRating-like CSV file."""
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            'PolicyID': np.arange(100),
+            'TransactionMonth': rng.choice(['2015-01-01 00:00:00', '2015-02-01 00:00:00'], 100),
+            'Province': rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], 100),
+            'PostalCode': rng.choice([1000, 2000], 100),
+            'TotalPremium': rng.exponential(100, 100),
+            'TotalClaims': rng.exponential(10, 100),
+            'Comment': [f'policy {i}' for i in range(100)],
+        })
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'data.csv')
+        self.df.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_load_optimizes_dtypes(self):
+        """Test dtype downcasting, category conversion and date parsing across chunks."""
+        loader = DataLoader(self.path, chunksize=30, verbose=False)
+        data = loader.load()
+        self.assertEqual(len(data), 100)
+        self.assertIsInstance(data['Province'].dtype, pd.CategoricalDtype)
+        self.assertEqual(data['TotalPremium'].dtype, 'float32')
+        self.assertEqual(data['PostalCode'].dtype, 'int16')
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(data['TransactionMonth']))
+        self.assertEqual(data['Comment'].dtype, 'object')
+        self.assertLess(loader.memory_report['memory_after_mb'], loader.memory_report['memory_before_mb'])
+
+    def test_category_decision_is_made_once(self):
+        """Test that a text column gets the dtype decided on the first chunk in every chunk."""
+        agents = ['agent'] * 30 + [f'agent {i}' for i in range(70)]
+        self.df.assign(Agent=agents).to_csv(self.path, index=False)
+        data = DataLoader(self.path, chunksize=30, verbose=False).load()
+        self.assertIsInstance(data['Agent'].dtype, pd.CategoricalDtype)
+        self.assertEqual(data['Agent'].tolist(), agents)
+
+    def test_from_loader(self):
+        """Test building an analysis class from the loader."""
+        eda = EDA.from_loader(DataLoader(self.path, columns=['Province', 'TotalPremium'], verbose=False))
+        self.assertEqual(eda.data.columns.tolist(), ['Province', 'TotalPremium'])
+
+
+if __name__ == '__main__':
+    unittest.main()
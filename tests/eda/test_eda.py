@@ -4,8 +4,12 @@ import pandas as pd
 import numpy as np
 import sys
 import os
+import tempfile
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
 from eda.eda import EDA
+from eda.segment_cube import SegmentCube
+from eda.profiler import StreamingProfiler
+from utils.quantile_sketch import QuantileSketch, SegmentedQuantileSketch
 
 class TestEDA(unittest.TestCase):
     
@@ -75,12 +79,173 @@ class TestEDA(unittest.TestCase):
         self.assertTrue((filtered_data['TotalPremium'] >= 1000).all())
         self.assertTrue((filtered_data['TotalPremium'] <= 2500).all())
 
+    def test_filter_outliers_per_segment(self):
+        """Test IQR filtering with per-segment fences and with a merged sketch."""
+        filtered = self.eda.filter_outliers('TotalPremium', by='Province')
+        self.assertEqual(len(filtered), 4)  # The row with a missing premium is dropped
+
+        sketch = SegmentedQuantileSketch(['TotalPremium']).update(self.df.head(2))
+        sketch.merge(SegmentedQuantileSketch(['TotalPremium']).update(self.df.tail(3)))
+        self.assertEqual(len(self.eda.filter_outliers('TotalPremium', sketch=sketch)), 4)
+
     def test_encode_categorical(self):
         """Test the encode_categorical method."""
         self.eda.encode_categorical()
         self.assertIn('LegalType_Commercial', self.eda.data.columns)
         self.assertIn('LegalType_Personal', self.eda.data.columns)
 
+    def test_encode_categorical_sparse(self):
+        """Test the sparse encoding of the encode_categorical method."""
+        self.eda.encode_categorical(encoding='sparse')
+        self.assertIsInstance(self.eda.data['LegalType_Personal'].dtype, pd.SparseDtype)
+
+    def test_monthly_change_is_cached(self):
+        """Test that the monthly-change feature is computed once and reused."""
+        self.eda.data['TransactionMonth'] = '2024-01-01'
+        change = self.eda.monthly_change('TotalPremium')
+        self.eda.data.loc[0, 'TotalPremium'] = 0
+        pd.testing.assert_series_equal(self.eda.monthly_change('TotalPremium'), change)
+        self.assertFalse(self.eda.monthly_change('TotalPremium', refresh=True).equals(change))
+
+    def test_plot_sample_caps_points_and_hue_levels(self):
+        """Test that the scatter sample is capped in rows and hue levels."""
+        self.eda.data['x'] = np.arange(5.0)
+        self.eda.data['y'] = np.arange(5.0)
+        sample = self.eda._plot_sample('x', 'y', 'make', max_points=3, max_hue_levels=1, random_state=0)
+        self.assertLessEqual(len(sample), 3)
+        self.assertEqual(set(sample['make']) - {'Toyota'}, {'Other'})
+
+    def test_render_report_caches_charts(self):
+        """Test that the report is rendered to files and unchanged charts are reused."""
+        with tempfile.TemporaryDirectory() as tmp:
+            charts = self.eda.render_report(tmp, columns=['TotalPremium', 'TotalClaims', 'Province'])
+            self.assertEqual(set(charts['kind']), {'histogram', 'boxplot', 'bar', 'heatmap'})
+            self.assertTrue(all(os.path.exists(path) for path in charts['path']))
+            self.assertFalse(charts['cached'].any())
+
+            self.eda.data.loc[0, 'TotalClaims'] = 900
+            charts = self.eda.render_report(tmp, columns=['TotalPremium', 'TotalClaims', 'Province'])
+            cached = charts.set_index('chart')['cached']
+            self.assertTrue(cached['hist_TotalPremium'])
+            self.assertFalse(cached['hist_TotalClaims'])
+            self.assertFalse(cached['correlation_matrix'])
+
+    def test_group_by_analysis_from_cube(self):
+        """Test that the cube answers group-bys with the same means as the raw data."""
+        expected = self.df.groupby('Province')[['TotalPremium', 'TotalClaims', 'SumInsured']].mean()
+        self.eda.build_cube()
+        result = self.eda.group_by_analysis('Province')
+        pd.testing.assert_frame_equal(result[expected.columns], expected)
+
+        totals = self.eda.premium_claim_analysis(by='Province')
+        self.assertAlmostEqual(totals.loc['Gauteng', 'ClaimToPremiumRatio'], 1500 / 3500)
+
+    def test_group_by_analysis_cube_matches_raw(self):
+        """Test that building the cube does not change group_by_analysis on missing keys or extra columns."""
+        df = self.df.assign(Province=self.df['Province'].where(self.df.index != 1))
+        raw = EDA(df).group_by_analysis('Province')
+
+        only_measures = EDA(df.drop(columns=['CustomValueEstimate']))
+        expected = only_measures.group_by_analysis('Province')
+        only_measures.build_cube()
+        pd.testing.assert_frame_equal(only_measures.group_by_analysis('Province'), expected)
+
+        with_extra = EDA(df.assign(kilowatts=[100.0, 90.0, 80.0, 70.0, 60.0]))
+        expected = with_extra.group_by_analysis('Province')
+        with_extra.build_cube()
+        result = with_extra.group_by_analysis('Province')
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertIn('kilowatts', result.columns)
+        self.assertNotIn(np.nan, result.index)
+        pd.testing.assert_frame_equal(result.drop(columns='kilowatts'), raw)
+
+
+class TestSegmentCube(unittest.TestCase):
+
+    def setUp(self):
+        """Set up random policies in three provinces."""
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            'Province': rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], 1000),
+            'TransactionMonth': rng.choice(['2015-01-01', '2015-02-01'], 1000),
+            'TotalPremium': rng.exponential(100, 1000),
+            'TotalClaims': np.where(rng.random(1000) < 0.9, 0.0, rng.exponential(2000, 1000)),
+        })
+        self.measures = ['TotalPremium', 'TotalClaims']
+
+    def test_chunked_build_matches_single_pass(self):
+        """Test that a cube built chunk by chunk equals one built from all rows."""
+        groupings = [('Province', 'TransactionMonth')]
+        cube = SegmentCube(['Province', 'TransactionMonth'], self.measures, groupings).update(self.df)
+        chunked = SegmentCube(['Province', 'TransactionMonth'], self.measures, groupings)
+        for start in range(0, len(self.df), 300):
+            chunked.update(self.df.iloc[start:start + 300])
+
+        pd.testing.assert_frame_equal(cube.summary(('Province', 'TransactionMonth')),
+                                      chunked.summary(('Province', 'TransactionMonth')))
+        expected = self.df.groupby('TransactionMonth')['TotalClaims'].agg(['std', 'max'])
+        summary = chunked.summary('TransactionMonth')['TotalClaims']
+        np.testing.assert_allclose(summary['std'], expected['std'])
+        np.testing.assert_allclose(summary['max'], expected['max'])
+
+    def test_save_load_and_segment_tester(self):
+        """Test that a saved cube feeds the same statistics to SegmentTester as the raw data."""
+        from ab_testing.segment_tester import SegmentTester
+
+        cube = SegmentCube(['Province'], self.measures).update(self.df)
+        with tempfile.TemporaryDirectory() as tmp:
+            cube.save(os.path.join(tmp, 'cube.joblib'))
+            loaded = SegmentCube.load(os.path.join(tmp, 'cube.joblib'))
+
+        expected = SegmentTester(self.df).pairwise_tests('Province', 'TotalClaims')
+        result = SegmentTester(group_stats=loaded.group_stats).pairwise_tests('Province', 'TotalClaims')
+        np.testing.assert_allclose(result['p_value'], expected['p_value'])
+        with self.assertRaises(KeyError):
+            loaded.query('PostalCode')
+
+class TestStreamingProfiler(unittest.TestCase):
+
+    def setUp(self):
+        """Set up numeric columns with missing values and a categorical column."""
+        rng = np.random.default_rng(1)
+        self.df = pd.DataFrame({
+            'Province': rng.choice(['Gauteng', 'Limpopo'], 5000),
+            'TotalPremium': rng.exponential(100, 5000) + 1e6,
+            'SumInsured': np.where(rng.random(5000) < 0.2, np.nan, rng.exponential(1e5, 5000)),
+        })
+        self.df['CustomValueEstimate'] = self.df['SumInsured'] * 2 + rng.normal(0, 1e4, 5000)
+
+    def test_streamed_profile_matches_pandas(self):
+        """Test that the chunked profile matches describe, corr and the missing-value table."""
+        profiler = StreamingProfiler(sketch_size=200)
+        for start in range(0, len(self.df), 700):
+            profiler.update(self.df.iloc[start:start + 700])
+
+        expected = self.df.describe()
+        summary = profiler.summary()
+        for stat in ('count', 'mean', 'std', 'min', 'max'):
+            np.testing.assert_allclose(summary.loc[stat], expected.loc[stat], rtol=1e-9)
+        # Sketch quantiles are approximate: compare ranks rather than values
+        for col in profiler.numeric_columns:
+            rank = (self.df[col] <= summary.loc['50%', col]).mean() / self.df[col].notna().mean()
+            self.assertAlmostEqual(rank, 0.5, delta=0.03)
+
+        np.testing.assert_allclose(profiler.correlation(), self.df.corr(numeric_only=True), atol=1e-9)
+        np.testing.assert_allclose(profiler.covariance(), self.df.cov(numeric_only=True), rtol=1e-6)
+        self.assertEqual(profiler.missing_values().loc['SumInsured', 'Missing Values'],
+                         self.df['SumInsured'].isnull().sum())
+
+    def test_quantile_sketch_merge(self):
+        """Test that merged sketches keep exact counts and extremes and accurate quantiles."""
+        values = np.random.default_rng(2).lognormal(5, 2, 20000)
+        sketch = QuantileSketch(k=200).update(values[:12000])
+        sketch.merge(QuantileSketch(k=200, random_state=1).update(values[12000:]))
+        self.assertEqual(sketch.count, 20000)
+        self.assertEqual(sketch.quantile(1.0), values.max())
+        ranks = np.searchsorted(np.sort(values), sketch.quantile([0.1, 0.5, 0.9])) / len(values)
+        np.testing.assert_allclose(ranks, [0.1, 0.5, 0.9], atol=0.03)
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,468 @@
+import unittest
+import contextlib
+import io
+import pandas as pd
+import numpy as np
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from statical_modeling.data_preparation.data_preprocessor import DataPreprocessor
+from statical_modeling.modeling.model_builder import ModelBuilder
+from statical_modeling.modeling.sufficient_stats_regression import SufficientStatsRegression
+from statical_modeling.tuning.hyperparameter_tuner import HyperparameterTuner
+from statical_modeling.interpretability.model_interpretability import ModelInterpretability
+from statical_modeling.serving.scoring_service import ScoringService, make_server
+from statical_modeling.registry.artifact_registry import ArtifactRegistry
+
+class TestDataPreprocessor(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a sample DataFrame for testing."""
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            'TotalPremium': rng.exponential(100, 200),
+            'TotalClaims': np.where(rng.random(200) < 0.8, 0, rng.exponential(5000, 200)),
+            'SumInsured': rng.integers(1000, 500000, 200),
+            'Province': rng.choice(['Gauteng', 'Western Cape', 'KwaZulu-Natal'], 200),
+            'VehicleType': rng.choice(['Passenger Vehicle', 'Medium Commercial'], 200),
+        })
+        self.df.loc[3, 'TotalPremium'] = np.nan
+
+    def test_cap_outliers_matches_per_column_quantile(self):
+        """Test that the vectorized capping matches capping each column at its 99th percentile."""
+        expected = self.df.copy()
+        for col in expected.select_dtypes(include=['number']).columns:
+            cap_value = expected[col].quantile(0.99)
+            expected[col] = expected[col].apply(lambda x: min(x, cap_value))
+
+        preprocessor = DataPreprocessor(self.df.copy())
+        preprocessor.cap_outliers()
+        pd.testing.assert_frame_equal(preprocessor.data, expected, check_dtype=False)
+
+    def test_cap_outliers_reuses_fitted_caps(self):
+        """Test lower/upper capping and reusing caps fitted on other data."""
+        preprocessor = DataPreprocessor(self.df.copy())
+        caps = preprocessor.cap_outliers(upper_quantile=0.95, lower_quantile=0.05)
+        self.assertGreaterEqual(preprocessor.data['TotalPremium'].min(), caps['lower']['TotalPremium'])
+        self.assertLessEqual(preprocessor.data['TotalPremium'].max(), caps['upper']['TotalPremium'])
+
+        new_data = DataPreprocessor(self.df.head(20).copy())
+        new_data.cap_outliers(caps=caps)
+        self.assertLessEqual(new_data.data['SumInsured'].max(), caps['upper']['SumInsured'])
+
+    def test_cap_outliers_per_segment_from_sketches(self):
+        """Test per-Province caps from quantile sketches and reusing them on new data."""
+        preprocessor = DataPreprocessor(self.df.copy())
+        caps = preprocessor.cap_outliers(upper_quantile=0.9, by='Province')
+        self.assertEqual(caps['by'], 'Province')
+        self.assertEqual(set(caps['upper'].index), set(self.df['Province']))
+        capped_max = preprocessor.data.groupby('Province')['TotalPremium'].max()
+        pd.testing.assert_series_equal(capped_max, caps['upper']['TotalPremium'], check_names=False)
+
+        new_data = DataPreprocessor(self.df.head(20).copy())
+        new_data.cap_outliers(caps=caps)
+        upper = new_data.data['Province'].map(caps['upper']['SumInsured'])
+        self.assertTrue((new_data.data['SumInsured'] <= upper).all())
+
+    def test_transform_reproduces_fit(self):
+        """Test that transform() on the training data reproduces the fitted output."""
+        preprocessor = DataPreprocessor(self.df.copy()).fit()
+        transformed = preprocessor.transform(self.df.copy())
+        pd.testing.assert_frame_equal(transformed, preprocessor.data)
+
+    def test_transform_fixed_schema_after_save_and_load(self):
+        """Test that a saved and reloaded state produces the fitted columns on new data."""
+        preprocessor = DataPreprocessor(self.df.copy()).fit()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'preprocessor.joblib')
+            preprocessor.save(path)
+            loaded = DataPreprocessor.load(path)
+
+        new_data = pd.DataFrame({
+            'TotalPremium': [50.0, np.inf],
+            'TotalClaims': [0.0, 10.0],
+            'SumInsured': [5000, np.nan],
+            'Province': ['Limpopo', 'Gauteng'],
+            'VehicleType': ['Passenger Vehicle', None],
+        })
+        transformed = loaded.transform(new_data)
+        self.assertEqual(transformed.columns.tolist(), preprocessor.data.columns.tolist())
+        self.assertFalse(transformed.isna().any().any())
+        self.assertFalse(transformed.loc[0, 'Province_Western Cape'])
+
+    def test_encode_categorical_data_modes(self):
+        """Test the sparse, codes and category encodings."""
+        dense = DataPreprocessor(self.df.copy())
+        dense.preprocess()
+
+        sparse_encoded = DataPreprocessor(self.df.copy())
+        sparse_encoded.preprocess(encoding='sparse')
+        self.assertEqual(sparse_encoded.data.columns.tolist(), dense.data.columns.tolist())
+        self.assertIsInstance(sparse_encoded.data['Province_Western Cape'].dtype, pd.SparseDtype)
+
+        codes = DataPreprocessor(self.df.copy())
+        codes.preprocess(encoding='codes')
+        self.assertTrue(pd.api.types.is_integer_dtype(codes.data['Province']))
+
+        with self.assertRaises(ValueError):
+            DataPreprocessor(self.df.copy()).preprocess(encoding='invalid')
+
+
+class TestModelBuilder(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a small preprocessed dataset."""
+        rng = np.random.default_rng(1)
+        self.df = pd.DataFrame({
+            'TotalPremium': rng.exponential(100, 300),
+            'SumInsured': rng.integers(1000, 500000, 300).astype(float),
+            'TotalClaims': rng.exponential(50, 300),
+            'Province': rng.choice(['Gauteng', 'Western Cape', 'KwaZulu-Natal'], 300),
+        })
+
+    def build(self, encoding):
+        preprocessor = DataPreprocessor(self.df.copy())
+        preprocessor.preprocess(encoding=encoding)
+        model_builder = ModelBuilder(*preprocessor.split_data(target_column='TotalPremium'))
+        model_builder.train_linear_regression()
+        model_builder.train_xgboost()
+        model_builder.evaluate_models()
+        return model_builder
+
+    def test_accepts_sparse_and_categorical_encodings(self):
+        """Test that ModelBuilder trains and evaluates on the sparse and category encodings."""
+        for encoding in ('sparse', 'category', 'codes'):
+            model_builder = self.build(encoding)
+            self.assertEqual(set(model_builder.results), {'Linear Regression', 'XGBoost'})
+
+    def test_train_models_in_parallel(self):
+        """Test concurrent training records timing and memory for every model."""
+        preprocessor = DataPreprocessor(self.df.copy())
+        preprocessor.preprocess()
+        model_builder = ModelBuilder(*preprocessor.split_data(target_column='TotalPremium'))
+        model_builder.train_models(n_jobs=2, model_threads={'Random Forest': 1})
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            model_builder.display_evaluation()  # Training costs only, before evaluate_models
+        self.assertIn('Wall Time', output.getvalue())
+        self.assertNotIn('MSE', output.getvalue())
+        model_builder.evaluate_models()
+
+        self.assertEqual(set(model_builder.models), {'Linear Regression', 'Random Forest', 'XGBoost'})
+        self.assertEqual(model_builder.models['Random Forest'].n_jobs, 1)
+        for metrics in model_builder.results.values():
+            self.assertIn('MSE', metrics)
+            self.assertGreater(metrics['Wall Time (s)'], 0)
+
+    def test_update_models_with_new_data(self):
+        """Test that new rows extend the boosted rounds and trees, and update the linear model exactly."""
+        preprocessor = DataPreprocessor(self.df.copy())
+        preprocessor.preprocess()
+        X_train, X_test, y_train, y_test = preprocessor.split_data(target_column='TotalPremium')
+        X_old, X_new, y_old, y_new = X_train[:150], X_train[150:], y_train[:150], y_train[150:]
+        model_builder = ModelBuilder(X_old, X_test, y_old, y_test)
+        model_builder.train_linear_regression()
+        model_builder.train_random_forest(params={'n_estimators': 10})
+        model_builder.train_xgboost(params={'n_estimators': 20})
+
+        model_builder.update_models(X_new, y_new, n_new_trees=5, n_boost_rounds=10)
+        self.assertEqual(model_builder.models['XGBoost'].get_booster().num_boosted_rounds(), 30)
+        self.assertEqual(len(model_builder.models['Random Forest'].estimators_), 15)
+        self.assertIsInstance(model_builder.models['Linear Regression'], SufficientStatsRegression)
+        # The history is not copied: the training set is the new rows only
+        self.assertIs(model_builder.X_train, X_new)
+        for metrics in model_builder.results.values():
+            self.assertGreater(metrics['Update Time (s)'], 0)
+
+        # The incremental linear model equals one fitted on all rows at once
+        full = ModelBuilder(X_train, X_test, y_train, y_test)
+        full.train_linear_regression()
+        np.testing.assert_allclose(model_builder.models['Linear Regression'].coef_, full.models['Linear Regression'].coef_)
+        model_builder.evaluate_models()
+        self.assertEqual(set(model_builder.results), {'Linear Regression', 'Random Forest', 'XGBoost'})
+
+        # A sliding window of the most recent rows
+        model_builder.update_models(X_old[:30], y_old[:30], model_names=['Linear Regression'], history_rows=50)
+        pd.testing.assert_frame_equal(model_builder.X_train, pd.concat([X_new[-20:], X_old[:30]]))
+        self.assertEqual(model_builder.models['Linear Regression'].n_samples_, len(X_train) + 30)
+
+    def test_partial_update_keeps_the_linear_history(self):
+        """Test that updating only XGBoost does not drop the rows of a later Linear Regression update."""
+        preprocessor = DataPreprocessor(self.df.copy())
+        preprocessor.preprocess()
+        X_train, X_test, y_train, y_test = preprocessor.split_data(target_column='TotalPremium')
+        model_builder = ModelBuilder(X_train[:80], X_test, y_train[:80], y_test)
+        model_builder.train_linear_regression()
+        model_builder.train_xgboost(params={'n_estimators': 5})
+
+        model_builder.update_models(X_train[80:120], y_train[80:120], model_names=['XGBoost'], n_boost_rounds=2)
+        model_builder.update_models(X_train[120:], y_train[120:], model_names=['Linear Regression'])
+        self.assertEqual(model_builder.models['Linear Regression'].n_samples_, len(X_train.dropna()))
+
+        full = ModelBuilder(X_train, X_test, y_train, y_test)
+        full.train_linear_regression()
+        np.testing.assert_allclose(model_builder.models['Linear Regression'].coef_, full.models['Linear Regression'].coef_)
+
+    def test_sufficient_stats_regression_partial_fit(self):
+        """Test that partial_fit over chunks matches a single fit."""
+        X = self.df[['SumInsured', 'TotalClaims']]
+        y = self.df['TotalPremium']
+        model = SufficientStatsRegression()
+        for start in range(0, len(X), 100):
+            model.partial_fit(X[start:start + 100], y[start:start + 100])
+        expected = SufficientStatsRegression().fit(X, y)
+        self.assertEqual(model.n_samples_, len(X))
+        np.testing.assert_allclose(model.coef_, expected.coef_)
+        np.testing.assert_allclose(model.predict(X), expected.predict(X))
+        with self.assertRaises(ValueError):
+            model.partial_fit(X[['TotalClaims', 'SumInsured']], y)
+
+        # Standard errors equal the closed-form OLS standard errors
+        design = np.column_stack([np.ones(len(X)), X.to_numpy()])
+        residuals = y.to_numpy() - design @ np.concatenate([[expected.intercept_], expected.coef_])
+        sigma2 = residuals @ residuals / (len(X) - design.shape[1])
+        stderr = np.sqrt(sigma2 * np.diag(np.linalg.inv(design.T @ design)))
+        np.testing.assert_allclose(expected.summary()['Std. Error'], stderr)
+
+    def test_train_linear_regression_streaming(self):
+        """Test that the streamed, merged fit of several files equals the in-memory fit."""
+        preprocessor = DataPreprocessor(self.df.copy())
+        preprocessor.preprocess()
+        data = preprocessor.data.astype(float)
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, 'year_1.csv'), os.path.join(tmp, 'year_2.csv')]
+            data[:120].to_csv(paths[0], index=False)
+            data[120:].to_csv(paths[1], index=False)
+            model_builder = ModelBuilder(None, data.drop(columns=['TotalPremium']), None, data['TotalPremium'])
+            model_builder.train_linear_regression_streaming(paths, 'TotalPremium', chunksize=50, n_jobs=2)
+
+        model = model_builder.models['Linear Regression']
+        expected = SufficientStatsRegression().fit(data.drop(columns=['TotalPremium']), data['TotalPremium'])
+        self.assertEqual(model.n_samples_, len(data))
+        np.testing.assert_allclose(model.coef_, expected.coef_)
+        np.testing.assert_allclose(model.coef_stderr_, expected.coef_stderr_)
+        model_builder.evaluate_models()
+        self.assertIn('R2 Score', model_builder.results['Linear Regression'])
+
+
+class TestHyperparameterTuner(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.X = pd.DataFrame(rng.random((600, 3)), columns=['a', 'b', 'c'])
+        self.y = self.X['a'] * 3 + rng.random(600) * 0.1
+
+    def test_search_and_resume(self):
+        """Test successive halving with early stopping and resuming from the saved results table."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'results.csv')
+            param_space = {'max_depth': [2, 4], 'learning_rate': [0.1, 0.3]}
+            tuner = HyperparameterTuner(self.X, self.y, param_space=param_space, min_resource=200,
+                                        max_estimators=50, n_jobs=1, results_path=path)
+            best = tuner.search(method='halving', n_candidates=3)
+            self.assertIn('n_estimators', best)
+            self.assertEqual(len(tuner.results), 4)  # 3 candidates on 200 rows, the best on 600 rows
+
+            resumed = HyperparameterTuner(self.X, self.y, param_space=param_space, min_resource=200,
+                                          max_estimators=50, n_jobs=1, results_path=path)
+            self.assertEqual(resumed.search(method='halving', n_candidates=3), best)
+            self.assertEqual(len(resumed.results), 4)
+
+            # Other evaluation settings are not served from the stored trials
+            changed = HyperparameterTuner(self.X, self.y, param_space=param_space, min_resource=200,
+                                          max_estimators=30, n_jobs=1, results_path=path)
+            changed.search(method='halving', n_candidates=3)
+            self.assertEqual(len(changed.results), 8)
+
+            # A resumed run on changed data evaluates its trials again
+            changed_data = HyperparameterTuner(self.X, self.y * 2, param_space=param_space, min_resource=200,
+                                               max_estimators=50, n_jobs=1, results_path=path)
+            self.assertIsNone(changed_data._select_best())
+            changed_data.search(method='halving', n_candidates=3)
+            self.assertEqual(len(changed_data.results), 12)
+            self.assertGreater(changed_data.best_score_, resumed.best_score_)
+
+            # Only stored trials from the current parameter space are selected
+            narrowed = HyperparameterTuner(self.X, self.y, param_space={'max_depth': [3], 'learning_rate': [0.1]},
+                                           min_resource=200, max_estimators=50, n_jobs=1, results_path=path)
+            self.assertIsNone(narrowed._select_best())
+            self.assertEqual(narrowed.search(method='halving', n_candidates=1)['max_depth'], 3)
+
+
+class TestModelInterpretability(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.X = pd.DataFrame(rng.random((400, 3)), columns=['a', 'b', 'c'])
+        y = self.X['a'] * 3 + self.X['b']
+        import xgboost as xgb
+        self.model = xgb.XGBRegressor(n_estimators=20).fit(self.X, y)
+
+    def test_compute_shap_values_chunked_and_cached(self):
+        """Test that chunked SHAP values match a single pass and are served from the cache."""
+        interpretability = ModelInterpretability(self.model, self.X)
+        full, _ = interpretability.compute_shap_values()
+        chunked, _ = interpretability.compute_shap_values(chunk_size=150, n_jobs=2)
+        np.testing.assert_allclose(chunked, full, rtol=1e-5)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sampled, X_sampled = interpretability.compute_shap_values(sample_size=100, cache_dir=tmp_dir)
+            self.assertEqual(len(os.listdir(tmp_dir)), 1)
+            cached, X_cached = interpretability.compute_shap_values(sample_size=100, cache_dir=tmp_dir)
+        np.testing.assert_array_equal(cached, sampled)
+        self.assertTrue(X_cached.index.equals(X_sampled.index))
+        self.assertAlmostEqual(len(X_sampled), 100, delta=10)
+
+        importance = interpretability.shap_feature_importance(sample_size=100)
+        self.assertEqual(importance.index[0], 'a')
+
+    def test_explain_policies_is_deterministic_across_workers(self):
+        """Test batch LIME explanations return one record per feature and do not depend on n_jobs."""
+        interpretability = ModelInterpretability(self.model, self.X)
+        rows = self.X.index[:4]
+        explainer = interpretability.build_lime_explainer()
+        random_state = explainer.random_state
+        serial = interpretability.explain_policies(rows=rows, num_features=2, num_samples=300,
+                                                   predict_batch_size=128)
+        parallel = interpretability.explain_policies(rows=rows, num_features=2, num_samples=300, n_jobs=2)
+        self.assertEqual(len(serial), 8)
+        pd.testing.assert_frame_equal(serial, parallel)
+        # The explainer kept by the instance is not reseeded by the serial run
+        self.assertIs(explainer.random_state, random_state)
+        self.assertIs(explainer.base.random_state, random_state)
+
+
+class TestArtifactRegistry(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        X = pd.DataFrame(rng.random((200, 3)), columns=['a', 'b', 'c'])
+        y = X['a'] * 2 + rng.random(200)
+        self.split = (X[:150], X[150:], y[:150], y[150:])
+
+    def test_unchanged_inputs_load_the_stored_model(self):
+        """Test that retraining on unchanged inputs is a registry hit and changed params are not."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            registry = ArtifactRegistry(tmp_dir)
+            first = ModelBuilder(*self.split, registry=registry)
+            first.train_xgboost(params={'n_estimators': 10})
+            first.evaluate_models()
+
+            second = ModelBuilder(*self.split, registry=registry)
+            second.train_xgboost(params={'n_estimators': 10})
+            second.evaluate_models()
+            self.assertEqual(second.model_keys['XGBoost'], first.model_keys['XGBoost'])
+            self.assertEqual(second.results['XGBoost']['MSE'], first.results['XGBoost']['MSE'])
+            self.assertEqual(list(registry.entries()['kind'].value_counts().sort_index()), [1, 1])
+
+            second.train_xgboost(params={'n_estimators': 11})
+            self.assertNotEqual(second.model_keys['XGBoost'], first.model_keys['XGBoost'])
+
+    def test_least_recently_used_artifacts_are_evicted(self):
+        """Test LRU eviction once the registry holds more than max_entries artifacts."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            registry = ArtifactRegistry(tmp_dir, max_entries=2)
+            registry.put('first', np.arange(10))
+            registry.put('second', np.arange(20))
+            os.utime(os.path.join(tmp_dir, 'first', 'metadata.json'), (0, 0))
+            os.utime(os.path.join(tmp_dir, 'second', 'metadata.json'), (1, 1))
+            registry.get('first')
+            registry.put('third', np.arange(30))
+
+            self.assertEqual(set(registry.entries()['key']), {'first', 'third'})
+            self.assertIsNone(registry.get('second'))
+            np.testing.assert_array_equal(registry.get('third'), np.arange(30))
+
+            # An entry evicted while it is being loaded is a miss
+            os.remove(os.path.join(tmp_dir, 'third', 'metadata.json'))
+            self.assertIsNone(registry.get('third'))
+
+
+class TestScoringService(unittest.TestCase):
+
+    def setUp(self):
+        """Fit a preprocessor and an XGBoost model, and save both."""
+        rng = np.random.default_rng(3)
+        self.df = pd.DataFrame({
+            'TotalPremium': rng.exponential(100, 300),
+            'SumInsured': rng.integers(1000, 500000, 300).astype(float),
+            'TotalClaims': rng.exponential(50, 300),
+            'Province': rng.choice(['Gauteng', 'Western Cape', 'KwaZulu-Natal'], 300),
+        })
+        preprocessor = DataPreprocessor(self.df.copy()).fit()
+        model_builder = ModelBuilder(*preprocessor.split_data(target_column='TotalPremium'))
+        model_builder.train_xgboost(params={'n_estimators': 20})
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.preprocessor_path = os.path.join(self.tmp_dir.name, 'preprocessor.joblib')
+        self.model_path = os.path.join(self.tmp_dir.name, 'model.joblib')
+        preprocessor.save(self.preprocessor_path)
+        model_builder.save_model('XGBoost', self.model_path)
+        self.records = self.df.drop(columns=['TotalPremium']).head(50).to_dict('records')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_micro_batched_predictions_match_batch_prediction(self):
+        """Test that concurrent single-record requests are batched and match one vectorized call."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        service = ScoringService.from_files(self.preprocessor_path, self.model_path, max_wait_ms=20)
+        expected = service.predict_frame(pd.DataFrame(self.records))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            predictions = list(executor.map(lambda record: service.predict(record)[0], self.records))
+        service.stop()
+
+        np.testing.assert_allclose(predictions, expected, rtol=1e-6)
+        stats = service.stats()
+        self.assertEqual(stats['records'], 50)
+        self.assertLess(stats['batches'], 50)
+        self.assertGreater(stats['p99_latency_ms'], 0)
+
+    def test_invalid_record_fails_only_its_request(self):
+        """Test that an invalid record in a micro-batch fails its own request and not the others."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        service = ScoringService.from_files(self.preprocessor_path, self.model_path, max_wait_ms=200)
+        records = self.records[:8] + [{**self.records[8], 'SumInsured': 'abc'}]
+
+        def predict(record):
+            try:
+                return service.predict(record)[0]
+            except ValueError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(records)) as executor:
+            predictions = list(executor.map(predict, records))
+        service.stop()
+
+        self.assertIsNone(predictions[-1])
+        np.testing.assert_allclose(predictions[:-1], service.predict_frame(pd.DataFrame(records[:-1])), rtol=1e-6)
+
+    def test_http_server(self):
+        """Test the /predict and /stats endpoints of the HTTP server."""
+        import json
+        import threading
+        import urllib.request
+
+        service = ScoringService.from_files(self.preprocessor_path, self.model_path)
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            request = urllib.request.Request(url + '/predict', data=json.dumps({'records': self.records[:3]}).encode(),
+                                             headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request) as response:
+                predictions = json.load(response)['predictions']
+            with urllib.request.urlopen(url + '/stats') as response:
+                stats = json.load(response)
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.stop()
+
+        np.testing.assert_allclose(predictions, service.predict_frame(pd.DataFrame(self.records[:3])), rtol=1e-6)
+        self.assertEqual(stats['records'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import pandas as pd
+import numpy as np
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from statical_modeling.data_preparation.data_preprocessor import DataPreprocessor
+from statical_modeling.modeling.model_builder import ModelBuilder
+from utils.instrumentation import Instrumentation, instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            'TotalPremium': rng.exponential(100, 200),
+            'TotalClaims': rng.exponential(50, 200),
+            'SumInsured': rng.integers(1000, 500000, 200).astype(float),
+            'Province': rng.choice(['Gauteng', 'Western Cape'], 200),
+        })
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.configure()
+        instrumentation.reset()
+
+    def test_preprocess_stages_are_recorded(self):
+        """Test that the preprocessing stages are recorded, nested, with rows, and written to the metrics file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            metrics_file = os.path.join(tmp, 'metrics.jsonl')
+            instrumentation.configure(metrics_file=metrics_file, profile_dir=os.path.join(tmp, 'profiles'),
+                                      trace_allocations=True)
+            DataPreprocessor(self.df.copy()).preprocess()
+            with open(metrics_file) as file:
+                lines = file.readlines()
+            profiles = os.listdir(os.path.join(tmp, 'profiles'))
+
+        records = {record['stage']: record for record in instrumentation.records()}
+        self.assertEqual(len(lines), len(records))
+        for name in ('handle_infinity', 'cap_outliers', 'feature_engineering', 'encode_categorical_data'):
+            record = records[f"DataPreprocessor.{name}"]
+            self.assertEqual(record['parent'], 'DataPreprocessor.preprocess')
+            self.assertEqual(record['rows'], 200)
+            self.assertEqual(record['status'], 'ok')
+            self.assertGreaterEqual(record['peak_alloc_mb'], 0)
+        self.assertIsNone(records['DataPreprocessor.preprocess']['parent'])
+        # Only the outermost stage is profiled
+        self.assertEqual(profiles, [os.path.basename(records['DataPreprocessor.preprocess']['profile'])])
+        self.assertIn('DataPreprocessor.preprocess', instrumentation.summary().index)
+
+    def test_failed_stage_is_recorded(self):
+        """Test that a stage records an error status and re-raises, and that nothing is recorded when disabled."""
+        recorder = Instrumentation()
+        with self.assertRaises(KeyError):
+            with recorder.stage('load') as record:
+                record['rows'] = 10
+                raise KeyError('Policy')
+        self.assertEqual([(r['stage'], r['status'], r['rows']) for r in recorder.records()], [('load', 'error', 10)])
+
+        recorder.configure(enabled=False)
+        self.assertEqual(recorder.instrumented()(len)([1, 2]), 2)
+        self.assertEqual(len(recorder.records()), 1)
+
+    def test_worker_stages_are_sent_to_the_parent(self):
+        """Test that the stages run in the worker processes of train_models are recorded in the parent."""
+        preprocessor = DataPreprocessor(self.df.copy())
+        preprocessor.preprocess()
+        model_builder = ModelBuilder(*preprocessor.split_data(target_column='TotalPremium'))
+        instrumentation.reset()
+        model_builder.train_models(['Linear Regression', 'XGBoost'], n_jobs=2)
+
+        records = {record['stage']: record for record in instrumentation.records()}
+        for name in ('ModelBuilder.train_linear_regression', 'ModelBuilder.train_xgboost'):
+            self.assertEqual(records[name]['parent'], 'ModelBuilder.train_models')
+            self.assertNotEqual(records[name]['pid'], os.getpid())
+            self.assertEqual(records[name]['rows'], 160)
+
+
+if __name__ == '__main__':
+    unittest.main()